@@ -1,22 +1,55 @@
 import cv2
+import os
 import time
-import numpy as np
 from config import (
     EAR_THRESHOLD_DEFAULT, BLINK_CONSEC_FRAMES, 
-    DOT_DURATION_THRESHOLD, LETTER_PAUSE_THRESHOLD, 
-    WORD_PAUSE_THRESHOLD, CAMERA_ID, FRAME_WIDTH, FRAME_HEIGHT
+    CAMERA_ID, FRAME_WIDTH, FRAME_HEIGHT, PATIENT_ID,
+    PROFILE_DIR, DISPLAY_FPS, DISPLAY_MAX_FPS, RATE_REPORT_INTERVAL, FRAME_ALLOC_PROBE,
+    PROFILE_AUTO_MATCH
 )
 from blink_detector import BlinkDetector
 from morse_logic import MorseDecoder
 from tts_engine import TTSEngine
 from calibration import Calibrator
-from ui_overlay import draw_calibration_ui, draw_mode_selection_ui, draw_active_ui
-from modes import PATIENT_MODE, MORSE_MODE, CALIBRATION, MODE_SELECTION
+from ui_overlay import draw_calibration_ui, draw_mode_selection_ui, draw_active_ui, draw_idle_ui
+from modes import PATIENT_MODE, MORSE_MODE, CALIBRATION, MODE_SELECTION, PatientVocabulary
+from transcript import Transcript
+from session import InputSession
+from metrics import RateMeter, RenderScheduler, AllocationProbe
+from frame_buffers import FrameBuffers
+from power import IdleController
+from profiles import ProfileStore, ProfileVerifier, CalibrationProfile, SignatureCollector
+
+def apply_profile(profile, calibrator, detector, session):
+    """Loads a stored calibration profile into the pipeline. Returns the EAR threshold."""
+    calibrator.apply_profile(profile)
+    detector.set_eye_thresholds(*profile.eye_thresholds)
+    if detector.input_method != profile.input_method:
+        detector.set_input_method(profile.input_method)
+    session.set_timing(**profile.timing)
+    return profile.threshold
+
+def open_patient(patient_id):
+    """Usage-weighted command codes and transcript history for one patient."""
+    vocabulary = PatientVocabulary(patient_id=patient_id)
+    transcript = Transcript(history_path=os.path.join(PROFILE_DIR, f"{patient_id}_transcript.txt"))
+    return vocabulary, transcript
 
 def main():
+    startup_time = time.time()
+    
+    # Stored calibration: the patient's own profile, else the last one used
+    profile_store = ProfileStore(PROFILE_DIR)
+    profile = profile_store.load(PATIENT_ID)
+    if profile is None and PROFILE_AUTO_MATCH:
+        profile = profile_store.get_last_used()
+    profile_user = profile.user_id if profile else PATIENT_ID
+    
     # 1. Initialize Components
     detector = BlinkDetector()
-    decoder = MorseDecoder()
+    vocabulary, transcript = open_patient(profile_user)
+    decoder = MorseDecoder(vocabulary, transcript)
+    session = InputSession(decoder)
     tts = TTSEngine()
     calibrator = Calibrator()
     
@@ -35,20 +68,30 @@ def main():
     if not cap.isOpened():
         print("Error: Could not open camera.")
         return
+    
+    # Reused capture/canvas memory, nothing image-sized is allocated per frame
+    buffers = FrameBuffers(CANVAS_WIDTH, CANVAS_HEIGHT)
+    alloc_probe = AllocationProbe(FRAME_ALLOC_PROBE)
 
     # 3. System State
-    current_state = CALIBRATION
-    calibrator.start()
-    
     # Runtime Variables
     current_ear_threshold = EAR_THRESHOLD_DEFAULT
-    blink_start_time = 0
-    blinking = False
-    last_blink_end_time = time.time()
-    blink_counter = 0
+    signatures = SignatureCollector()
+    verifier = None
+    ready_reported = False
     
-    # Mode-Specific Buffers
-    morse_buffer = ""
+    if profile:
+        # Usable at once, checked against live EAR in the background
+        current_ear_threshold = apply_profile(profile, calibrator, detector, session)
+        current_state = profile.mode or MODE_SELECTION
+        if current_state in (PATIENT_MODE, MORSE_MODE):
+            decoder.set_mode(current_state)
+        candidates = profile_store.load_all() if PROFILE_AUTO_MATCH else ()
+        verifier = ProfileVerifier(profile, candidates)
+        print(f"Loaded calibration profile '{profile.user_id}' (threshold {profile.threshold:.3f}).")
+    else:
+        current_state = CALIBRATION
+        calibrator.start()
     
     # Mode Switch Safety
     last_mode_switch_time = 0
@@ -57,154 +100,189 @@ def main():
     # Timing State Tracking
     gap_state = "NONE" # NONE, SYMBOL_GAP, LETTER_GAP, WORD_GAP
     
-    tts.speak("Welcome. Starting calibration.")
+    # Display runs on its own cadence, detection runs on every frame
+    render_scheduler = RenderScheduler(DISPLAY_FPS, DISPLAY_MAX_FPS)
+    detect_rate = RateMeter()
+    display_rate = RateMeter()
+    last_rate_report = time.time()
+    
+    # Low-power presence scanning while nobody is in front of the camera
+    idle = IdleController()
+    
+    tts.speak("Welcome back." if profile else "Welcome. Starting calibration.")
 
     while True:
-        ret, frame = cap.read()
+        alloc_probe.begin_frame()
+        if idle.is_idle and not idle.should_scan(time.time()):
+            # Keep the camera drained without decoding the frame
+            ret = cap.grab()
+            frame_ready = False
+        else:
+            ret, frame = buffers.read(cap)
+            frame_ready = True
         if not ret:
             break
             
-        # Create dedicated Canvas
-        canvas = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), dtype=np.uint8)
-        
-        # Resize frame if needed to fit our slot (optional safety)
-        fh, fw, _ = frame.shape
-        limit_h = min(fh, CANVAS_HEIGHT)
-        limit_w = min(fw, CANVAS_WIDTH)
-        canvas[0:limit_h, 0:limit_w] = frame[0:limit_h, 0:limit_w]
-            
         # ---------------------------------------------------------
         # COMMON PROCESSING
         # ---------------------------------------------------------
-        left_ear, right_ear, landmarks, blink_event = detector.process_frame(frame, current_ear_threshold)
+        if idle.is_idle:
+            left_ear, right_ear, landmarks, blink_event = 0.0, 0.0, [], None
+            current_time = time.time()
+            if frame_ready:
+                face_present = detector.detect_presence(frame)
+                if idle.update(current_time, face_present) == "WAKE":
+                    print("Face detected. Resuming full processing.")
+                    detector.reset_state()
+                    session.reset(current_time)
+                    last_mode_switch_time = current_time # Warmup before accepting blinks
+        else:
+            left_ear, right_ear, landmarks, blink_event = detector.process_frame(frame, current_ear_threshold)
+            current_time = time.time()
+            detect_rate.tick(current_time)
+            # Calibration counts as present, it must not be interrupted
+            face_present = bool(landmarks) or current_state == CALIBRATION
+            if idle.update(current_time, face_present) == "IDLE":
+                print("No face detected. Entering idle mode.")
         avg_ear = (left_ear + right_ear) / 2.0
-        current_time = time.time()
         
         # Check Warmup Delay
         if current_time - last_mode_switch_time < WARMUP_DELAY:
             blink_event = None # Suppress all input during warmup
         
-        # Draw Landmarks (Canvas)
-        for (x, y) in landmarks:
-             cv2.circle(canvas, (x, y), 1, (0, 255, 0), -1)
-
+        # Validate the loaded profile against the first seconds of live EAR
+        if verifier is not None and not idle.is_idle and current_state != CALIBRATION:
+            verdict = verifier.update(avg_ear, landmarks, current_time)
+            if verdict is not None:
+                status, matched = verdict
+                verifier = None
+                if status == "MATCH":
+                    print(f"Calibration profile '{profile.user_id}' confirmed.")
+                    profile_store.mark_used(profile)
+                elif status == "SWITCH":
+                    print(f"Face matches profile '{matched.user_id}', switching.")
+                    profile = matched
+                    profile_user = profile.user_id
+                    current_ear_threshold = apply_profile(profile, calibrator, detector, session)
+                    # Usage counts and transcript follow the identified patient
+                    vocabulary, transcript = open_patient(profile_user)
+                    decoder.set_patient(vocabulary, transcript)
+                    session.reset(current_time)
+                    verifier = ProfileVerifier(profile)
+                else:
+                    print("Calibration profile does not fit. Recalibrating.")
+                    current_state = CALIBRATION
+                    calibrator.start()
+                    signatures.clear()
+                    decoder.reset()
+                    session.reset()
+                    tts.speak("Recalibrating.")
+        
         # ---------------------------------------------------------
         # STATE MACHINE
         # ---------------------------------------------------------
         
-        if current_state == CALIBRATION:
-            calibrator.update(avg_ear)
-            draw_calibration_ui(canvas, calibrator)
+        if idle.is_idle:
+            # Nothing to decode without a face
+            pass
+            
+        elif current_state == CALIBRATION:
+            calibrator.update(avg_ear, left_ear=left_ear, right_ear=right_ear)
+            if landmarks:
+                signatures.add(landmarks)
             
             if not calibrator.is_calibrating:
                 current_ear_threshold = calibrator.get_threshold()
+                detector.set_eye_thresholds(*calibrator.get_eye_thresholds())
+                if calibrator.succeeded:
+                    # Keep the user's mode, timing and (if no face was seen) signature
+                    last_mode = profile.mode if profile else None
+                    signature = signatures.median()
+                    if signature is None and profile:
+                        signature = profile.signature
+                    profile = CalibrationProfile.from_calibrator(profile_user, calibrator, signature)
+                    profile.timing = {"dot": session.dot_threshold, "letter": session.letter_pause,
+                                      "word": session.word_pause}
+                    profile.input_method = detector.input_method
+                    profile.mode = last_mode
+                    profile_store.mark_used(profile)
+                    print(f"Saved calibration profile '{profile.user_id}'.")
+                    tts.speak("Calibration done. Select mode.")
+                else:
+                    # Nothing usable was measured, the stored profile stays as it was
+                    tts.speak("Calibration failed. Select mode.")
                 current_state = MODE_SELECTION
-                tts.speak("Calibration done. Select mode.")
                 
         elif current_state == MODE_SELECTION:
-            draw_mode_selection_ui(canvas)
             # Key Handling is below
+            pass
             
-        elif current_state == PATIENT_MODE:
-            # ---------------------------
-            # STRICT PATIENT MODE TIMING
-            # ---------------------------
-            # Rule: Accumulate symbols -> Decode ONLY on WORD GAP (2.5s)
-            
-            if blink_event:
-                symbol = "." if blink_event.duration < DOT_DURATION_THRESHOLD else "-"
-                decoder.add_signal(symbol) 
-                last_blink_end_time = blink_event.end_time
-                blinking = False
-                
-            blinking = detector.is_closed
-            
-            # Gap Analysis
-            time_since_last = current_time - last_blink_end_time
-            
-            # Identify Gap State
-            if time_since_last >= WORD_PAUSE_THRESHOLD:
-                # WORD GAP Reached -> Commit Sequence
-                if decoder.current_sequence:
-                     # For Patient Mode, sequence IS the word identifier
-                     word = decoder.decode_sequence()
-                     if word:
-                         print(f"Patient Command: {word}")
-                         tts.speak(word)
-                         decoder.complete_word() # Flush buffer
-                     else:
-                         # Invalid sequence, still flush to reset
-                         decoder.reset()
-            
-            # UI Update
-            debug_data = {
-                'ear': avg_ear,
-                'threshold': current_ear_threshold,
-                'blinking': blinking
-            }
-            draw_active_ui(canvas, current_state, debug_data, decoder.get_display_text())
+        elif current_state in (PATIENT_MODE, MORSE_MODE):
+            if not ready_reported and current_time - last_mode_switch_time >= WARMUP_DELAY:
+                # Key startup metric: power-on to first usable blink
+                print(f"Ready for input {current_time - startup_time:.1f}s after start.")
+                ready_reported = True
+            for text in session.update(current_state, blink_event, detector.is_closed, current_time):
+                tts.speak(text)
 
-        elif current_state == MORSE_MODE:
-            # ---------------------------
-            # STRICT MORSE MODE TIMING
-            # ---------------------------
-            # Rules:
-            # 1. Accumulate symbols in local buffer
-            # 2. Local Buffer -> Decoder on LETTER GAP (1.0s)
-            # 3. Decoder -> Speak on WORD GAP (2.5s)
-            
-            if blink_event:
-                 symbol = "." if blink_event.duration < DOT_DURATION_THRESHOLD else "-"
-                 morse_buffer += symbol
-                 last_blink_end_time = blink_event.end_time
-                 blinking = False
-            
-            blinking = detector.is_closed
-            
-            # Gap Analysis
-            gap_duration = current_time - last_blink_end_time
-            
-            # 1. WORD GAP CHECK (Highest Priority)
-            if not blinking and gap_duration >= WORD_PAUSE_THRESHOLD:
-                # "Decode any pending symbol buffer"
-                if morse_buffer:
-                    for s in morse_buffer: 
-                        decoder.add_signal(s)
-                    decoder.decode_sequence()
-                    morse_buffer = ""
+        # ---------------------------------------------------------
+        # DISPLAY (own cadence, redrawn early when something visible changed)
+        # ---------------------------------------------------------
+        ui_signature = (
+            current_state, idle.is_idle, detector.is_closed, session.morse_buffer,
+            decoder.current_sequence, decoder.current_word,
+            transcript.revision, vocabulary.current_category
+        )
+        render_due = render_scheduler.is_due(current_time, ui_signature)
+        if idle.is_idle:
+            # Idle screen is static, only draw it once
+            render_due = ui_signature != render_scheduler.last_signature
+        
+        if render_due:
+            if idle.is_idle:
+                canvas = buffers.clear()
+                draw_idle_ui(canvas)
+            else:
+                # Video into the top-left of the persistent canvas (cropped if larger)
+                canvas = buffers.compose(frame)
                 
-                # Finalize Word
-                if decoder.current_word:
-                    word = decoder.complete_word()
-                    if word:
-                        print(f"Speaking Morse: {word}")
-                        tts.speak(word)
-                        
-            # 2. LETTER GAP CHECK
-            elif not blinking and morse_buffer and gap_duration >= LETTER_PAUSE_THRESHOLD:
-                # Commit local buffer to decoder
-                for s in morse_buffer:
-                    decoder.add_signal(s)
-                decoder.decode_sequence() # E.g. ".." -> "I"
-                morse_buffer = "" # Clear local
-
-            # UI Update
-            ui_data = decoder.get_display_text()
-            if morse_buffer:
-                ui_data['current_signals'] = morse_buffer
+                # Draw Landmarks (Canvas)
+                for (x, y) in landmarks:
+                     cv2.circle(canvas, (x, y), 1, (0, 255, 0), -1)
+                
+                if current_state == CALIBRATION:
+                    draw_calibration_ui(canvas, calibrator)
+                elif current_state == MODE_SELECTION:
+                    draw_mode_selection_ui(canvas)
+                else:
+                    ui_data = session.get_display_text()
+                    
+                    debug_data = {
+                        'ear': avg_ear,
+                        'threshold': current_ear_threshold,
+                        'blinking': detector.is_closed,
+                        'input_method': detector.input_method,
+                        'detect_fps': detect_rate.get_rate(),
+                        'display_fps': display_rate.get_rate(),
+                        'profile': f"{profile_user} (checking)" if verifier else profile_user
+                    }
+                    draw_active_ui(canvas, current_state, debug_data, ui_data)
             
-            debug_data = {
-                'ear': avg_ear,
-                'threshold': current_ear_threshold,
-                'blinking': blinking
-            }
-            draw_active_ui(canvas, current_state, debug_data, ui_data)
-
+            cv2.imshow("Blink Morse AI", canvas)
+            render_scheduler.mark_rendered(current_time, ui_signature)
+            display_rate.tick(current_time)
+        
+        if current_time - last_rate_report >= RATE_REPORT_INTERVAL:
+            print(f"Rates: detection {detect_rate.get_rate():.1f} FPS, display {display_rate.get_rate():.1f} FPS")
+            print(idle.format_report())
+            print(f"Frame buffers allocated: {buffers.allocations + detector.allocations}. {alloc_probe.format_report()}")
+            last_rate_report = current_time
+        
+        alloc_probe.end_frame()
+        
         # ---------------------------------------------------------
-        # DISPLAY & INPUT
+        # INPUT (polled every frame, independent of redraws)
         # ---------------------------------------------------------
-        cv2.imshow("Blink Morse AI", canvas)
-        
         key = cv2.waitKey(1) & 0xFF
         
         if key == 27: # ESC
@@ -214,10 +292,29 @@ def main():
         if key == ord('c'):
             print("Force Calibration")
             current_state = CALIBRATION
+            verifier = None
             calibrator.start()
+            signatures.clear()
             decoder.reset()
-            morse_buffer = ""
+            session.reset()
             
+        # Toggle wink input (left eye = dot, right eye = dash, both held = commit)
+        if key == ord('w'):
+            new_method = "duration" if detector.input_method == "wink" else "wink"
+            detector.set_input_method(new_method)
+            session.reset()
+            if profile:
+                profile.input_method = new_method
+                profile_store.save(profile)
+            print(f"Input method: {new_method}")
+            tts.speak("Wink input" if new_method == "wink" else "Blink input")
+
+        # Re-assign Patient Mode codes from usage history
+        if key == ord('b') and current_state == PATIENT_MODE:
+            vocabulary.rebalance()
+            print(f"Patient codes rebalanced. Avg blinks/cmd: {vocabulary.get_expected_blinks():.2f}")
+            tts.speak("Commands updated")
+
         # Mode Switching with HARD RESET
         new_mode = None
         if current_state == MODE_SELECTION:
@@ -234,20 +331,25 @@ def main():
              tts.speak("Select mode")
              # Reset Everything on exit too
              decoder.reset()
-             morse_buffer = ""
+             session.reset()
              
         if new_mode:
             current_state = new_mode
             decoder.set_mode(new_mode)
             # HARD RESET STATE
-            morse_buffer = ""
             decoder.reset()
             last_mode_switch_time = time.time()
             # Also reset blink timers so we don't trigger immediate gaps
-            last_blink_end_time = time.time() 
+            session.reset(last_mode_switch_time)
+            if profile:
+                # Resumed directly on the next start
+                profile.mode = new_mode
+                profile_store.save(profile)
 
     # Cleanup
+    print(idle.format_report())
     cap.release()
+    detector.close()
     cv2.destroyAllWindows()
     tts.stop()
 
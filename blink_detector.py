@@ -1,42 +1,41 @@
 import cv2
 import time
-import mediapipe as mp
-try:
-    from mediapipe import solutions
-    mp.solutions = solutions
-except ImportError:
-    try:
-        import mediapipe.python.solutions as solutions
-        mp.solutions = solutions
-    except ImportError:
-        pass
+from collections import deque
 import numpy as np
 from scipy.spatial import distance as dist
-from config import BLINK_CONSEC_FRAMES
-
-class BlinkEvent:
-    def __init__(self, duration, end_time):
-        self.duration = duration
-        self.end_time = end_time
+from config import BLINK_CONSEC_FRAMES, IDLE_SCAN_SCALE, INPUT_METHOD, EAR_THRESHOLD_DEFAULT, LANDMARK_BACKEND
+from blink_state import BlinkStateMachine, WinkClassifier
+from landmark_backends import create_backend, LEFT_EYE_INDICES, RIGHT_EYE_INDICES
+from frame_buffers import ensure_buffer
 
 class BlinkDetector:
-    def __init__(self):
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, backend=None):
+        # Landmark source, see landmark_backends.py
+        self.backend = backend if backend is not None else create_backend(LANDMARK_BACKEND)
+        self.last_timestamp_ms = 0
         
         # Landmark indices for Left and Right eyes
-        self.LEFT_EYE = [362, 385, 387, 263, 373, 380]
-        self.RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+        self.LEFT_EYE = LEFT_EYE_INDICES
+        self.RIGHT_EYE = RIGHT_EYE_INDICES
+        
+        # Open/closed timing on the averaged EAR
+        self.blink_state = BlinkStateMachine()
+        
+        # Wink input: one state machine per eye, thresholds from calibration
+        self.wink_state = WinkClassifier()
+        self.input_method = INPUT_METHOD
+        self.eye_thresholds = (EAR_THRESHOLD_DEFAULT, EAR_THRESHOLD_DEFAULT)
         
-        self.closing_start_time = None
-        self.is_closed = False
-        # We still use a small buffer to avoid noise (e.g. 50ms)
-        self.MIN_BLINK_DURATION = 0.05 
+        # Last result, reused while an async backend has nothing new
+        self.last_output = (0.0, 0.0, [])
+        # Events beyond the first from one batch of results, handed out on later frames
+        self.pending_events = deque()
+        
+        # Persistent conversion buffers (backends copy what they keep)
+        self.rgb_buffer = None
+        self.small_buffer = None
+        self.small_rgb_buffer = None
+        self.allocations = 0
         
     def calculate_ear(self, landmarks, indices):
         """Calculates Eye Aspect Ratio (EAR) for a set of eye landmarks."""
@@ -50,54 +49,93 @@ class BlinkDetector:
         ear = (A + B) / (2.0 * C)
         return ear
 
+    def next_timestamp_ms(self):
+        """Capture timestamp for the backend, strictly increasing as mediapipe requires."""
+        self.last_timestamp_ms = max(int(time.time() * 1000), self.last_timestamp_ms + 1)
+        return self.last_timestamp_ms
+
     def process_frame(self, frame, threshold):
         """
         Processes a video frame to detect face landmarks and calculate EAR.
         Returns: (left_ear, right_ear, landmarks_list, blink_event)
+        With an asynchronous backend the values belong to the newest finished
+        frame. Every finished frame still goes through the blink state
+        machine, in capture order, so a closure is never shortened by
+        results that arrived together; if such a batch completes more than
+        one blink, the extra events are returned on the following frames.
         """
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(frame_rgb)
+        self.rgb_buffer, allocated = ensure_buffer(self.rgb_buffer, frame.shape)
+        self.allocations += allocated
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+        results = self.backend.process(frame_rgb, self.next_timestamp_ms())
         
-        left_ear = 0.0
-        right_ear = 0.0
-        face_landmarks_np = []
-        blink_event = None
-        avg_ear = 0.0
+        h, w, c = frame.shape
+        for result in sorted(results, key=lambda r: r.timestamp_ms):
+            left_ear = 0.0
+            right_ear = 0.0
+            face_landmarks_np = []
 
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                h, w, c = frame.shape
-                
-                landmarks = [(int(pt.x * w), int(pt.y * h)) for pt in face_landmarks.landmark]
+            if result.landmarks:
+                landmarks = [(int(x * w), int(y * h)) for (x, y) in result.landmarks]
                 face_landmarks_np = landmarks
                 
                 left_ear = self.calculate_ear(landmarks, self.LEFT_EYE)
                 right_ear = self.calculate_ear(landmarks, self.RIGHT_EYE)
                 avg_ear = (left_ear + right_ear) / 2.0
                 
-                # Check Blink State
-                current_time = time.time()
-                
-                if avg_ear < threshold:
-                    # Eye Closed
-                    if not self.is_closed:
-                        self.is_closed = True
-                        self.closing_start_time = current_time
+                # Check Blink State, timed by when the frame was captured
+                capture_time = result.timestamp_ms / 1000.0
+                if self.input_method == "wink":
+                    blink_event = self.wink_state.update(left_ear, right_ear, *self.eye_thresholds, capture_time)
                 else:
-                    # Eye Open
-                    if self.is_closed:
-                        # Transition Closed -> Open
-                        self.is_closed = False
-                        if self.closing_start_time:
-                            duration = current_time - self.closing_start_time
-                            # Filter noise
-                            if duration >= self.MIN_BLINK_DURATION:
-                                blink_event = BlinkEvent(duration, current_time)
-                        self.closing_start_time = None
-                
-                break
-                
-        return left_ear, right_ear, face_landmarks_np, blink_event
+                    blink_event = self.blink_state.update(avg_ear, threshold, capture_time)
+                if blink_event:
+                    self.pending_events.append(blink_event)
+            
+            self.last_output = (left_ear, right_ear, face_landmarks_np)
+        
+        # No results: inference still running, the last values stay on screen
+        left_ear, right_ear, landmarks = self.last_output
+        blink_event = self.pending_events.popleft() if self.pending_events else None
+        return left_ear, right_ear, landmarks, blink_event
+
+    def detect_presence(self, frame, scale=IDLE_SCAN_SCALE):
+        """
+        Low-cost check for a face, used while idle.
+        Runs the backend's presence check on a downscaled frame.
+        """
+        h, w, c = frame.shape
+        small_shape = (max(1, int(h * scale)), max(1, int(w * scale)), c)
+        self.small_buffer, allocated = ensure_buffer(self.small_buffer, small_shape)
+        self.allocations += allocated
+        self.small_rgb_buffer, allocated = ensure_buffer(self.small_rgb_buffer, small_shape)
+        self.allocations += allocated
+        small = cv2.resize(frame, (small_shape[1], small_shape[0]), dst=self.small_buffer, interpolation=cv2.INTER_AREA)
+        small_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.small_rgb_buffer)
+        return self.backend.detect_presence(small_rgb, self.next_timestamp_ms())
+
+    def reset_state(self):
+        """Drops any half-finished blink, e.g. when leaving idle."""
+        self.blink_state.reset()
+        self.wink_state.reset()
+        self.pending_events.clear()
+
+    def close(self):
+        self.backend.close()
+
+    def set_input_method(self, method):
+        """Switches between "duration" and "wink" input, dropping any half-finished blink."""
+        self.input_method = method
+        self.reset_state()
+
+    def set_eye_thresholds(self, left, right):
+        self.eye_thresholds = (left, right)
+
+    @property
+    def is_closed(self):
+        if self.input_method == "wink":
+            return self.wink_state.is_closed
+        return self.blink_state.is_closed
 
     def get_eye_coords(self, landmarks, indices):
         """Helper to get coordinates for drawing."""
@@ -0,0 +1,136 @@
+import time
+from config import WINK_MIN_DURATION, WINK_CONTROL_MIN_DURATION, WINK_CROSS_RATIO
+
+
+class BlinkEvent:
+    def __init__(self, duration, end_time):
+        self.duration = duration
+        self.end_time = end_time
+
+
+class BlinkStateMachine:
+    """
+    Open/closed tracking for one EAR signal.
+    Emits a BlinkEvent on the closed -> open transition.
+    """
+    def __init__(self, min_blink_duration=0.05):
+        self.closing_start_time = None
+        self.is_closed = False
+        # We still use a small buffer to avoid noise (e.g. 50ms)
+        self.MIN_BLINK_DURATION = min_blink_duration
+
+    def update(self, ear, threshold, now=None):
+        """Feeds one EAR sample. Returns a BlinkEvent or None."""
+        current_time = time.time() if now is None else now
+        blink_event = None
+
+        if ear < threshold:
+            # Eye Closed
+            if not self.is_closed:
+                self.is_closed = True
+                self.closing_start_time = current_time
+        else:
+            # Eye Open
+            if self.is_closed:
+                # Transition Closed -> Open
+                self.is_closed = False
+                if self.closing_start_time:
+                    duration = current_time - self.closing_start_time
+                    # Filter noise
+                    if duration >= self.MIN_BLINK_DURATION:
+                        blink_event = BlinkEvent(duration, current_time)
+                self.closing_start_time = None
+
+        return blink_event
+
+    def reset(self):
+        self.is_closed = False
+        self.closing_start_time = None
+
+
+class WinkEvent(BlinkEvent):
+    """A classified closure: kind is "left", "right" or "both"."""
+    def __init__(self, kind, duration, end_time):
+        super().__init__(duration, end_time)
+        self.kind = kind
+
+
+class WinkClassifier:
+    """
+    Runs one state machine per eye and classifies each closure episode
+    (from the first eye closing until both are open again) as a left
+    wink, a right wink or a deliberate both-eye closure.
+
+    Cross-eye debouncing: a brief sympathetic closure of the other eye
+    (shorter than WINK_CROSS_RATIO of the winking eye) does not turn a
+    wink into a both-eye event. Short both-eye closures are natural
+    blinks and are ignored.
+    """
+    def __init__(self, min_wink=WINK_MIN_DURATION, min_control=WINK_CONTROL_MIN_DURATION,
+                 cross_ratio=WINK_CROSS_RATIO):
+        self.left = BlinkStateMachine()
+        self.right = BlinkStateMachine()
+        self.min_wink = min_wink
+        self.min_control = min_control
+        self.cross_ratio = cross_ratio
+        self._reset_episode()
+
+    def _reset_episode(self):
+        self.in_episode = False
+        self.left_closed = 0.0
+        self.right_closed = 0.0
+        self.overlap = 0.0
+        self.both_closed_since = None
+
+    @property
+    def is_closed(self):
+        return self.left.is_closed or self.right.is_closed
+
+    def update(self, left_ear, right_ear, left_threshold, right_threshold, now=None):
+        """Feeds one pair of EAR samples. Returns a WinkEvent or None."""
+        current_time = time.time() if now is None else now
+        left_event = self.left.update(left_ear, left_threshold, current_time)
+        right_event = self.right.update(right_ear, right_threshold, current_time)
+
+        if self.is_closed:
+            self.in_episode = True
+        if left_event:
+            self.left_closed += left_event.duration
+        if right_event:
+            self.right_closed += right_event.duration
+
+        both_closed = self.left.is_closed and self.right.is_closed
+        if both_closed and self.both_closed_since is None:
+            self.both_closed_since = current_time
+        elif not both_closed and self.both_closed_since is not None:
+            self.overlap += current_time - self.both_closed_since
+            self.both_closed_since = None
+
+        if not self.in_episode or self.is_closed:
+            return None
+
+        event = self._classify(current_time)
+        self._reset_episode()
+        return event
+
+    def _classify(self, end_time):
+        longest = max(self.left_closed, self.right_closed)
+        shortest = min(self.left_closed, self.right_closed)
+        if longest == 0.0:
+            return None
+
+        if self.overlap > 0.0 and shortest >= self.cross_ratio * longest:
+            # Both eyes: held closure is a control symbol, a quick one is a natural blink
+            if self.overlap >= self.min_control:
+                return WinkEvent("both", self.overlap, end_time)
+            return None
+
+        if longest < self.min_wink:
+            return None
+        kind = "left" if self.left_closed > self.right_closed else "right"
+        return WinkEvent(kind, longest, end_time)
+
+    def reset(self):
+        self.left.reset()
+        self.right.reset()
+        self._reset_episode()
@@ -6,22 +6,37 @@ class Calibrator:
     def __init__(self):
         self.start_time = None
         self.ears = []
+        # Per-eye samples, for wink input
+        self.left_ears = []
+        self.right_ears = []
         self.is_calibrating = False
         self.calculated_threshold = EAR_THRESHOLD_DEFAULT
+        self.eye_thresholds = (EAR_THRESHOLD_DEFAULT, EAR_THRESHOLD_DEFAULT)
+        self.open_ear_stats = None
+        self.succeeded = False     # Last calibration produced new thresholds
 
-    def start(self):
-        self.start_time = time.time()
+    def start(self, now=None):
+        self.start_time = time.time() if now is None else now
         self.ears = []
+        self.left_ears = []
+        self.right_ears = []
         self.is_calibrating = True
+        # Stats from an earlier run or a loaded profile must not outlive a failed run
+        self.open_ear_stats = None
+        self.succeeded = False
         print("Calibration started.")
 
-    def update(self, ear):
+    def update(self, ear, now=None, left_ear=None, right_ear=None):
         if not self.is_calibrating:
             return
 
         self.ears.append(ear)
+        if left_ear is not None and right_ear is not None:
+            self.left_ears.append(left_ear)
+            self.right_ears.append(right_ear)
         
-        elapsed = time.time() - self.start_time
+        current_time = time.time() if now is None else now
+        elapsed = current_time - self.start_time
         if elapsed >= CALIBRATION_DURATION:
             self.complete_calibration()
 
@@ -38,19 +53,55 @@ class Calibrator:
         return max(0.0, CALIBRATION_DURATION - elapsed)
 
     def complete_calibration(self):
+        """Returns True when new thresholds were calculated (see `succeeded`)."""
         self.is_calibrating = False
         
         if not self.ears:
             print("Calibration failed: No data collected.")
-            return
+            return False
 
+        result = self._threshold_from(self.ears)
+        if result is None:
+             print("Calibration failed: All EARs were zero.")
+             return False
+
+        calculated, median_ear, min_ear = result
+        self.calculated_threshold = calculated
+        print(f"Calibration Complete. Median: {median_ear:.3f}, Min: {min_ear:.3f}, Thresh: {self.calculated_threshold:.3f}")
+
+        # Each eye gets its own threshold, falling back to the combined one
+        left = self._threshold_from(self.left_ears)
+        right = self._threshold_from(self.right_ears)
+        self.eye_thresholds = (
+            left[0] if left else calculated,
+            right[0] if right else calculated
+        )
+        print(f"Per-eye thresholds. Left: {self.eye_thresholds[0]:.3f}, Right: {self.eye_thresholds[1]:.3f}")
+
+        # Open-eye distribution, stored in the profile to validate it on later runs
         ear_array = np.array(self.ears)
+        open_ears = ear_array[ear_array >= calculated]
+        if len(open_ears) == 0:
+            open_ears = ear_array
+        self.open_ear_stats = {
+            "median": float(np.median(open_ears)),
+            "p10": float(np.percentile(open_ears, 10)),
+            "p90": float(np.percentile(open_ears, 90)),
+        }
+        self.succeeded = True
+        return True
+
+    def _threshold_from(self, ears):
+        """Returns (threshold, median, min) for a list of EAR samples, or None."""
+        if not ears:
+            return None
+
+        ear_array = np.array(ears)
         # Remove zeros
         ear_array = ear_array[ear_array > 0.0]
 
         if len(ear_array) == 0:
-             print("Calibration failed: All EARs were zero.")
-             return
+             return None
 
         # Simple robust statistics
         # We assume the user spent most of the time with eyes open
@@ -75,8 +126,22 @@ class Calibrator:
         if calculated < 0.15: calculated = 0.15
         if calculated > 0.35: calculated = 0.35
         
-        self.calculated_threshold = calculated
-        print(f"Calibration Complete. Median: {median_ear:.3f}, Min: {min_ear:.3f}, Thresh: {self.calculated_threshold:.3f}")
+        return calculated, median_ear, min_ear
 
     def get_threshold(self):
         return self.calculated_threshold
+
+    def get_eye_thresholds(self):
+        """(left, right) thresholds for wink input."""
+        return self.eye_thresholds
+
+    def get_open_ear_stats(self):
+        """{"median", "p10", "p90"} of open-eye EAR from the last calibration, or None."""
+        return self.open_ear_stats
+
+    def apply_profile(self, profile):
+        """Takes thresholds from a stored profile instead of calibrating."""
+        self.is_calibrating = False
+        self.calculated_threshold = profile.threshold
+        self.eye_thresholds = profile.eye_thresholds
+        self.open_ear_stats = profile.open_ear
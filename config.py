@@ -21,6 +21,20 @@ DOT_DURATION_THRESHOLD = 0.4  # Max duration for a DOT
 LETTER_PAUSE_THRESHOLD = 1.0  # Pause duration to consider end of letter
 WORD_PAUSE_THRESHOLD = 2.5    # Pause duration to consider end of word
 
+# Wink input (independent left/right channels)
+INPUT_METHOD = "duration"     # "duration" (short/long blink) or "wink" (left/right eye)
+CONTROL_SYMBOL = "control"    # Commits the pending letter/command without waiting for the pause
+WINK_SYMBOLS = {"left": ".", "right": "-", "both": CONTROL_SYMBOL}
+WINK_MIN_DURATION = 0.12      # Shortest one-eye closure counted as a wink
+WINK_CONTROL_MIN_DURATION = 0.4  # Both eyes must stay closed this long (natural blinks are shorter)
+WINK_CROSS_RATIO = 0.5        # Other eye closed less than this share of the wink is ignored
+
+
+# Face landmark backend
+LANDMARK_BACKEND = "legacy"     # "legacy" (mp.solutions FaceMesh), "tasks" (FaceLandmarker) or "synthetic"
+LANDMARK_REFINE = False         # Iris refinement (legacy only); EAR does not use iris points
+LANDMARK_MODEL_PATH = "models/face_landmarker.task"  # Tasks backend model file
+LANDMARK_RUNNING_MODE = "LIVE_STREAM"  # Tasks: "LIVE_STREAM" (async callbacks) or "VIDEO" (blocking)
 
 # Camera settings
 CAMERA_ID = 0
@@ -30,3 +44,60 @@ FRAME_HEIGHT = 480
 # Calibration
 CALIBRATION_DURATION = 5.0 # Seconds to calibrate
 CALIBRATION_BUFFER_SIZE = 100 # Number of frames to keep for stats
+
+# Patient Mode Vocabulary
+# Plain strings are direct commands. (CATEGORY, [words]) tuples open a
+# sub-menu: the first sequence picks the category, the next one the word.
+# Order is the tie-breaker when there is no usage history yet.
+PATIENT_VOCAB = [
+    "YES", "NO", "HELP", "PAIN", "WATER", "BATHROOM", "FAMILY", "FOOD",
+    "NURSE", "TIRED", "COLD", "HOT",
+    ("COMFORT", ["PILLOW", "BLANKET", "TURN ME", "SIT UP", "LIE DOWN"]),
+    ("PEOPLE", ["DOCTOR", "FRIEND", "CHAPLAIN", "ALONE"]),
+    ("ROOM", ["LIGHTS ON", "LIGHTS OFF", "TV", "MUSIC", "QUIET", "WINDOW"]),
+]
+
+# Codes used until the patient's own table is saved (the original short
+# codes). Other labels get the cheapest free codes in PATIENT_VOCAB order.
+PATIENT_DEFAULT_CODES = {
+    ".": "YES", "-": "NO", "..": "WATER", "--": "FOOD",
+    ".-": "HELP", "-.": "PAIN", "...": "BATHROOM", "---": "FAMILY",
+}
+
+# Relative effort of each symbol when assigning codes (a dash holds the eyes
+# closed for longer than a dot, so it costs more)
+PATIENT_DOT_COST = 1.0
+PATIENT_DASH_COST = 1.6
+
+# Per-patient usage history (drives code assignment across sessions)
+PATIENT_ID = "default"
+PROFILE_DIR = "profiles"
+
+# Calibration profiles (skip calibration when a stored profile still fits)
+PROFILE_AUTO_MATCH = True           # Identify the user by face geometry among stored profiles
+PROFILE_VERIFY_DURATION = 3.0       # Seconds of live EAR checked against the loaded profile
+PROFILE_EAR_TOLERANCE = 0.15        # Max relative drift of the open-eye EAR median
+PROFILE_MAX_CLOSED_FRACTION = 0.4   # More frames than this below threshold means a bad fit
+PROFILE_MATCH_DISTANCE = 0.08       # Max geometry signature distance for the same face
+
+# Transcript
+TRANSCRIPT_MAX_LINES = 200  # Wrapped lines kept in memory, older lines roll to disk
+
+# Display
+DISPLAY_FPS = 12            # Periodic redraw rate, independent of detection
+DISPLAY_MAX_FPS = 30        # Cap for early redraws when the visible state changes
+RATE_REPORT_INTERVAL = 30.0 # Seconds between detection/display rate log lines
+FRAME_ALLOC_PROBE = False   # Trace bytes allocated per frame (slows the app, for checking regressions)
+
+# Idle (no face) power saving
+IDLE_TIMEOUT = 20.0         # Seconds without a face before going idle
+IDLE_SCAN_INTERVAL = 0.5    # Presence scan period while idle (bounds wake-up latency)
+IDLE_SCAN_SCALE = 0.25      # Downscale factor for the idle presence scan
+
+# Soak test (soak.py) regression gates
+SOAK_MIN_GATE_HOURS = 12.0               # Simulated hours after warm-up before gates apply
+SOAK_MAX_HEAP_SLOPE_KB_PER_HOUR = 64.0   # tracemalloc current size (robust slope)
+SOAK_MAX_RSS_SLOPE_KB_PER_HOUR = 512.0   # Resident set size (noisier)
+SOAK_MAX_P95_RATIO = 2.0                 # Late per-stage p95 vs its level right after warm-up
+SOAK_P95_SLACK_MS = 0.1                  # Absolute allowance on top, for sub-millisecond stages
+SOAK_MAX_TTS_BACKLOG = 20                # Utterances waiting in the speech queue
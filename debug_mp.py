@@ -11,3 +11,12 @@ except AttributeError as e:
         print("Explicit import worked")
     except ImportError as ie:
         print("Explicit import failed:", ie)
+
+# Which landmark backends can be created here (see landmark_backends.py)
+from landmark_backends import BACKENDS, create_backend
+for name in BACKENDS:
+    try:
+        create_backend(name).close()
+        print(f"Backend '{name}': OK")
+    except Exception as e:
+        print(f"Backend '{name}' unavailable:", e)
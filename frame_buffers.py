@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def ensure_buffer(buffer, shape, dtype=np.uint8):
+    """
+    Returns (buffer, allocated). Reuses `buffer` when it already has the
+    requested shape and dtype, otherwise allocates a new one.
+    """
+    if buffer is not None and buffer.shape == shape and buffer.dtype == dtype:
+        return buffer, False
+    return np.empty(shape, dtype=dtype), True
+
+
+class FrameBuffers:
+    """
+    Persistent capture and canvas buffers for the main loop.
+    Frames are read into the same array each time and composed into a
+    view of one canvas, so the steady state allocates no image memory.
+    `allocations` counts every (re)allocation so regressions show up.
+    """
+    def __init__(self, canvas_width, canvas_height):
+        self.canvas = np.zeros((canvas_height, canvas_width, 3), dtype=np.uint8)
+        self.frame = None
+        self.allocations = 1
+
+    def read(self, cap):
+        """cap.read() into the reused frame buffer."""
+        ret, frame = cap.read(self.frame)
+        if ret and frame is not self.frame:
+            # First frame, or the camera changed resolution
+            self.frame = frame
+            self.allocations += 1
+        return ret, frame
+
+    def compose(self, frame):
+        """Copies the frame into the top-left of the canvas and clears the rest."""
+        ch, cw, _ = self.canvas.shape
+        fh, fw, _ = frame.shape
+        limit_h = min(fh, ch)
+        limit_w = min(fw, cw)
+        np.copyto(self.canvas[0:limit_h, 0:limit_w], frame[0:limit_h, 0:limit_w])
+        self.canvas[limit_h:, :] = 0
+        self.canvas[0:limit_h, limit_w:] = 0
+        return self.canvas
+
+    def clear(self):
+        self.canvas[:] = 0
+        return self.canvas
@@ -0,0 +1,349 @@
+"""
+Face landmark backends for BlinkDetector.
+
+All backends take RGB frames with a strictly increasing millisecond
+timestamp and return a list of the LandmarkResults (normalized (x, y)
+points) finished since the last call, oldest first. Synchronous backends
+always return one; asynchronous ones may return none or several.
+
+    python landmark_backends.py --compare legacy tasks synthetic
+"""
+import threading
+import time
+from collections import deque
+
+from config import (
+    LANDMARK_BACKEND, LANDMARK_REFINE, LANDMARK_MODEL_PATH, LANDMARK_RUNNING_MODE,
+    CAMERA_ID
+)
+
+# Landmark indices for Left and Right eyes (FaceMesh topology, shared by all backends)
+LEFT_EYE_INDICES = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
+NUM_LANDMARKS = 468
+
+
+def _import_solutions():
+    """Legacy `mp.solutions` moved around between mediapipe releases."""
+    import mediapipe as mp
+    try:
+        from mediapipe import solutions
+        return solutions
+    except ImportError:
+        pass
+    try:
+        import mediapipe.python.solutions as solutions
+        return solutions
+    except ImportError:
+        pass
+    solutions = getattr(mp, "solutions", None)
+    if solutions is None:
+        raise ImportError(
+            "This mediapipe build has no legacy solutions API. "
+            "Use LANDMARK_BACKEND = \"tasks\" instead."
+        )
+    return solutions
+
+
+class LandmarkResult:
+    def __init__(self, landmarks, timestamp_ms, latency_ms=0.0):
+        self.landmarks = landmarks      # [(x, y)] normalized, empty if no face
+        self.timestamp_ms = timestamp_ms
+        self.latency_ms = latency_ms    # Submit -> result
+
+
+class LandmarkBackend:
+    """Base class. Subclasses implement process()."""
+    name = "base"
+    is_async = False
+
+    def __init__(self):
+        self.last_latency_ms = 0.0      # Submit -> result, for comparison
+        self._last_presence = False
+
+    def process(self, frame_rgb, timestamp_ms):
+        raise NotImplementedError
+
+    def detect_presence(self, frame_rgb, timestamp_ms):
+        """Cheap face-present check for idle scans. Defaults to running the landmarker."""
+        results = self.process(frame_rgb, timestamp_ms)
+        if results:
+            self._last_presence = bool(results[-1].landmarks)
+        return self._last_presence
+
+    def wait_pending(self, timeout=1.0):
+        """Waits for in-flight results (async backends). Returns the unread ones, oldest first."""
+        return []
+
+    def close(self):
+        pass
+
+
+class LegacyFaceMeshBackend(LandmarkBackend):
+    """mp.solutions.face_mesh, synchronous."""
+    name = "legacy"
+
+    def __init__(self, refine_landmarks=LANDMARK_REFINE):
+        super().__init__()
+        self.solutions = _import_solutions()
+        # Iris refinement adds work EAR never uses, so it is off by default
+        self.face_mesh = self.solutions.face_mesh.FaceMesh(
+            max_num_faces=1,
+            refine_landmarks=refine_landmarks,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.face_detection = None
+
+    def process(self, frame_rgb, timestamp_ms):
+        start = time.perf_counter()
+        results = self.face_mesh.process(frame_rgb)
+        landmarks = []
+        if results.multi_face_landmarks:
+            face_landmarks = results.multi_face_landmarks[0]
+            landmarks = [(pt.x, pt.y) for pt in face_landmarks.landmark]
+        self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+        return [LandmarkResult(landmarks, timestamp_ms, self.last_latency_ms)]
+
+    def detect_presence(self, frame_rgb, timestamp_ms):
+        # The short-range face detector is much cheaper than FaceMesh
+        if self.face_detection is None:
+            self.face_detection = self.solutions.face_detection.FaceDetection(
+                model_selection=0,
+                min_detection_confidence=0.5
+            )
+        results = self.face_detection.process(frame_rgb)
+        return bool(results.detections)
+
+    def close(self):
+        self.face_mesh.close()
+        if self.face_detection is not None:
+            self.face_detection.close()
+
+
+class TasksFaceLandmarkerBackend(LandmarkBackend):
+    """
+    mediapipe Tasks FaceLandmarker. In LIVE_STREAM mode frames are submitted
+    with detect_async() and results arrive on mediapipe's thread, so capture,
+    inference and the blink state machine overlap. process() then returns the
+    results not yet handed out (usually from earlier frames). Every result
+    is kept until read, so no EAR sample is skipped when two arrive
+    between polls.
+    """
+    name = "tasks"
+
+    def __init__(self, model_path=LANDMARK_MODEL_PATH, running_mode=LANDMARK_RUNNING_MODE):
+        super().__init__()
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python import vision
+
+        self.mp = mp
+        self.is_async = running_mode == "LIVE_STREAM"
+        self._lock = threading.Lock()
+        # Unread results; bounded in case nobody polls for a while
+        self._results = deque(maxlen=30)
+        self._submitted = {}   # timestamp_ms -> perf_counter at submit
+
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=getattr(vision.RunningMode, running_mode),
+            num_faces=1,
+            min_face_detection_confidence=0.5,
+            min_face_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            output_face_blendshapes=False,
+            output_facial_transformation_matrixes=False,
+            result_callback=self._on_result if self.is_async else None
+        )
+        try:
+            self.landmarker = vision.FaceLandmarker.create_from_options(options)
+        except (RuntimeError, ValueError, FileNotFoundError) as e:
+            raise RuntimeError(
+                f"Could not load FaceLandmarker model '{model_path}'. Download "
+                f"face_landmarker.task from the MediaPipe model page and set LANDMARK_MODEL_PATH. ({e})"
+            )
+
+    @staticmethod
+    def _to_landmarks(result):
+        if not result.face_landmarks:
+            return []
+        return [(pt.x, pt.y) for pt in result.face_landmarks[0]]
+
+    def _on_result(self, result, image, timestamp_ms):
+        landmarks = self._to_landmarks(result)
+        with self._lock:
+            submitted = self._submitted.pop(timestamp_ms, None)
+            # Results for older frames may have been dropped by mediapipe
+            for stale in [ts for ts in self._submitted if ts < timestamp_ms]:
+                del self._submitted[stale]
+            latency_ms = 0.0
+            if submitted is not None:
+                latency_ms = (time.perf_counter() - submitted) * 1000.0
+                self.last_latency_ms = latency_ms
+            self._results.append(LandmarkResult(landmarks, timestamp_ms, latency_ms))
+
+    def process(self, frame_rgb, timestamp_ms):
+        image = self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=frame_rgb)
+        if not self.is_async:
+            start = time.perf_counter()
+            result = self.landmarker.detect_for_video(image, timestamp_ms)
+            self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+            return [LandmarkResult(self._to_landmarks(result), timestamp_ms, self.last_latency_ms)]
+
+        with self._lock:
+            self._submitted[timestamp_ms] = time.perf_counter()
+        self.landmarker.detect_async(image, timestamp_ms)
+        return self._take_results()
+
+    def _take_results(self):
+        with self._lock:
+            results = list(self._results)
+            self._results.clear()
+        return results
+
+    def wait_pending(self, timeout=1.0):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if not self._submitted:
+                    break
+            time.sleep(0.005)
+        return self._take_results()
+
+    def close(self):
+        self.landmarker.close()
+
+
+class SyntheticBackend(LandmarkBackend):
+    """
+    No model: builds eye landmarks with a scripted EAR, for tests and soak
+    runs. `ear_source(timestamp_ms)` returns (left_ear, right_ear) or None
+    for no face.
+    """
+    name = "synthetic"
+
+    def __init__(self, ear_source=None):
+        super().__init__()
+        self.ear_source = ear_source if ear_source is not None else (lambda ts: (0.3, 0.3))
+
+    @staticmethod
+    def _place_eye(points, indices, center_x, ear, aspect):
+        # EAR = vertical / horizontal; the vertical offset is scaled so the
+        # ratio holds in pixel space for a frame of the given aspect (w / h)
+        half_w = 0.03
+        half_h = ear * half_w * aspect
+        p0, p1, p2, p3, p4, p5 = indices
+        y = 0.4
+        points[p0] = (center_x - half_w, y)
+        points[p3] = (center_x + half_w, y)
+        points[p1] = (center_x - half_w / 2, y - half_h)
+        points[p2] = (center_x + half_w / 2, y - half_h)
+        points[p5] = (center_x - half_w / 2, y + half_h)
+        points[p4] = (center_x + half_w / 2, y + half_h)
+
+    def process(self, frame_rgb, timestamp_ms):
+        ears = self.ear_source(timestamp_ms)
+        if ears is None:
+            return [LandmarkResult([], timestamp_ms)]
+        h, w = frame_rgb.shape[:2]
+        aspect = w / float(h)
+        points = [(0.5, 0.5)] * NUM_LANDMARKS
+        left_ear, right_ear = ears
+        # Subject's left eye is on the image right
+        self._place_eye(points, LEFT_EYE_INDICES, 0.6, left_ear, aspect)
+        self._place_eye(points, RIGHT_EYE_INDICES, 0.4, right_ear, aspect)
+        return [LandmarkResult(points, timestamp_ms)]
+
+
+BACKENDS = {
+    "legacy": LegacyFaceMeshBackend,
+    "tasks": TasksFaceLandmarkerBackend,
+    "synthetic": SyntheticBackend,
+}
+
+
+def create_backend(name=LANDMARK_BACKEND, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown landmark backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def compare_backends(names, frames, interval_ms=33):
+    """
+    Runs each backend over the same RGB frames, submitted at camera pace
+    (`interval_ms` apart) so asynchronous backends drop frames only as
+    they would live. In-flight results are collected before closing.
+    Returns {name: {"blocking_ms": mean, "blocking_p95_ms", "latency_ms": mean, "faces"}}
+    or {name: {"error": text}} when a backend cannot be created.
+    """
+    from metrics import percentile
+    report = {}
+    for name in names:
+        try:
+            backend = create_backend(name)
+        except (ImportError, RuntimeError, ValueError) as e:
+            report[name] = {"error": str(e)}
+            continue
+        blocking = []
+        results = []
+        pace_start = time.perf_counter()
+        for i, frame_rgb in enumerate(frames):
+            delay = pace_start + i * interval_ms / 1000.0 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            results.extend(backend.process(frame_rgb, (i + 1) * interval_ms))
+            blocking.append((time.perf_counter() - start) * 1000.0)
+        results.extend(backend.wait_pending())
+        backend.close()
+        latencies = [r.latency_ms for r in results]
+        faces = sum(bool(r.landmarks) for r in results)
+        blocking.sort()
+        report[name] = {
+            "blocking_ms": sum(blocking) / len(blocking),
+            "blocking_p95_ms": percentile(blocking, 95),
+            "latency_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "faces": faces,
+        }
+    return report
+
+
+def _collect_frames(count, video=None):
+    import cv2
+    import numpy as np
+    cap = cv2.VideoCapture(video if video else CAMERA_ID)
+    frames = []
+    while cap.isOpened() and len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        print("No camera/video frames, comparing on blank frames (no face).")
+        frames.extend(np.full((720, 1280, 3), 128, dtype=np.uint8) for _ in range(count))
+    return frames
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare per-frame cost of landmark backends.")
+    parser.add_argument("--compare", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--interval-ms", type=int, default=33, help="Submission pacing (camera frame interval)")
+    parser.add_argument("--video", help="Video file instead of the camera")
+    args = parser.parse_args(argv)
+
+    frames = _collect_frames(args.frames, args.video)
+    report = compare_backends(args.compare, frames, args.interval_ms)
+    for name, stats in report.items():
+        if "error" in stats:
+            print(f"{name:>10}: unavailable ({stats['error']})")
+        else:
+            print(f"{name:>10}: blocking {stats['blocking_ms']:.2f} ms (p95 {stats['blocking_p95_ms']:.2f}), "
+                  f"result latency {stats['latency_ms']:.2f} ms, faces in {stats['faces']}/{len(frames)} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import time
+import tracemalloc
+from collections import deque
+
+
+def read_rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak, not current, but the best we get without /proc (KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
+
+
+def theil_sen_slope(xs, ys, max_points=300):
+    """
+    Median of pairwise slopes, so a few outlying samples cannot swing it
+    (0.0 with fewer than two points). Long series are thinned evenly to
+    `max_points` to bound the pair count.
+    """
+    n = len(xs)
+    if n > max_points:
+        step = n / float(max_points)
+        picks = [int(i * step) for i in range(max_points)]
+        xs = [xs[i] for i in picks]
+        ys = [ys[i] for i in picks]
+        n = max_points
+    slopes = [
+        (ys[j] - ys[i]) / (xs[j] - xs[i])
+        for i in range(n) for j in range(i + 1, n) if xs[j] != xs[i]
+    ]
+    if not slopes:
+        return 0.0
+    slopes.sort()
+    return percentile(slopes, 50)
+
+
+class RateMeter:
+    """Events per second over a sliding time window."""
+    def __init__(self, window=2.0):
+        self.window = window
+        self.times = deque()
+
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        self.times.append(now)
+        while self.times and now - self.times[0] > self.window:
+            self.times.popleft()
+
+    def get_rate(self):
+        if len(self.times) < 2:
+            return 0.0
+        span = self.times[-1] - self.times[0]
+        if span <= 0:
+            return 0.0
+        return (len(self.times) - 1) / span
+
+
+class RenderScheduler:
+    """
+    Decides when the display should be redrawn, independently of the
+    detection rate. Redraws periodically at `fps`, and sooner (up to
+    `max_fps`) when the visible state changed.
+    """
+    def __init__(self, fps, max_fps):
+        self.interval = 1.0 / fps
+        self.min_interval = 1.0 / max_fps
+        self.last_render = None
+        self.last_signature = None
+
+    def is_due(self, now, signature=None):
+        if self.last_render is None:
+            return True
+        elapsed = now - self.last_render
+        if elapsed >= self.interval:
+            return True
+        return signature != self.last_signature and elapsed >= self.min_interval
+
+    def mark_rendered(self, now, signature=None):
+        self.last_render = now
+        self.last_signature = signature
+
+
+class LatencyStats:
+    """Per-stage latency samples, summarised and cleared once per reporting window."""
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summarize(self):
+        """Returns {stage: {count, p50, p95, p99, max}} in milliseconds and starts a new window."""
+        summary = {}
+        for stage, values in self.samples.items():
+            values.sort()
+            summary[stage] = {
+                "count": len(values),
+                "p50": percentile(values, 50) * 1000.0,
+                "p95": percentile(values, 95) * 1000.0,
+                "p99": percentile(values, 99) * 1000.0,
+                "max": values[-1] * 1000.0 if values else 0.0,
+            }
+        self.samples = {}
+        return summary
+
+
+class AllocationProbe:
+    """
+    Bytes allocated per frame (peak above the frame's starting point), via
+    tracemalloc. Off by default, tracing slows every allocation.
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.frames = 0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.base = 0
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        allocated = max(0, tracemalloc.get_traced_memory()[1] - self.base)
+        self.frames += 1
+        self.total_bytes += allocated
+        self.max_bytes = max(self.max_bytes, allocated)
+
+    def format_report(self):
+        if not self.enabled or self.frames == 0:
+            return "Allocation probe off"
+        mean_kb = self.total_bytes / self.frames / 1024.0
+        text = f"Allocated per frame: {mean_kb:.1f} KB mean, {self.max_bytes / 1024.0:.1f} KB max"
+        self.frames = 0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        return text
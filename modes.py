@@ -1,22 +1,235 @@
+import heapq
+import json
+import os
+from config import (
+    PATIENT_VOCAB, PATIENT_DEFAULT_CODES, PATIENT_DOT_COST, PATIENT_DASH_COST, PROFILE_DIR
+)
+
 # Operation Modes
 CALIBRATION = "CALIBRATION"
 MODE_SELECTION = "MODE_SELECTION"
 PATIENT_MODE = "PATIENT_MODE"
 MORSE_MODE = "MORSE_MODE"
 
-# Patient Mode Vocabulary (Short codes)
-# Minimized for easy access
-PATIENT_VOCAB = {
-    ".": "YES",
-    "-": "NO",
-    "..": "WATER",
-    "--": "FOOD",
-    ".-": "HELP",
-    "-.": "PAIN",
-    "...": "BATHROOM",
-    "---": "FAMILY"
-}
-
-def get_patient_word(sequence):
-    """Returns the word corresponding to a sequence, or None."""
-    return PATIENT_VOCAB.get(sequence)
+
+def generate_codes(count, dot_cost=PATIENT_DOT_COST, dash_cost=PATIENT_DASH_COST):
+    """
+    Returns the `count` cheapest dot/dash sequences, cheapest first.
+    Sequences are committed by the word pause, so they do not need to be
+    prefix-free and every string is a valid code.
+    """
+    # Ties: fewer blinks first, then dots before dashes
+    codes = []
+    heap = [(dot_cost, 1, "0", "."), (dash_cost, 1, "1", "-")]
+    while heap and len(codes) < count:
+        cost, length, order, code = heapq.heappop(heap)
+        codes.append(code)
+        heapq.heappush(heap, (cost + dot_cost, length + 1, order + "0", code + "."))
+        heapq.heappush(heap, (cost + dash_cost, length + 1, order + "1", code + "-"))
+    return codes
+
+
+def assign_codes(weights, dot_cost=PATIENT_DOT_COST, dash_cost=PATIENT_DASH_COST):
+    """
+    Assigns codes to labels so that the expected blink cost is minimal.
+    `weights` is an ordered list of (label, weight); ties keep list order.
+    Returns {code: label}.
+    """
+    order = sorted(range(len(weights)), key=lambda i: (-weights[i][1], i))
+    codes = generate_codes(len(weights), dot_cost, dash_cost)
+    return {code: weights[i][0] for code, i in zip(codes, order)}
+
+
+def code_order(code, dot_cost=PATIENT_DOT_COST, dash_cost=PATIENT_DASH_COST):
+    """Sort key matching generate_codes(): cost, then fewer blinks, then dots first."""
+    cost = code.count(".") * dot_cost + code.count("-") * dash_cost
+    return (cost, len(code), code.replace(".", "0").replace("-", "1"))
+
+
+def extend_codes(codes, labels):
+    """
+    Keeps the existing {code: label} entries whose label is still in
+    `labels` and gives each label without one the cheapest free code, in
+    list order. Existing codes never move. Returns {code: label}, cheapest first.
+    """
+    labels = list(labels)
+    kept = {}
+    for code in sorted(codes, key=code_order):
+        label = codes[code]
+        if label in labels and label not in kept.values():
+            kept[code] = label
+    missing = [label for label in labels if label not in kept.values()]
+    free = [c for c in generate_codes(len(kept) + len(missing)) if c not in kept]
+    kept.update(zip(free, missing))
+    return {code: kept[code] for code in sorted(kept, key=code_order)}
+
+
+class PatientVocabulary:
+    """
+    Patient Mode command set with usage-driven code assignment.
+    The code table is saved per patient and only re-assigned by an explicit
+    rebalance(), so codes never shift under the patient, not even across
+    restarts. Without a saved table PATIENT_DEFAULT_CODES apply.
+    """
+    def __init__(self, vocab=PATIENT_VOCAB, patient_id=None, profile_dir=PROFILE_DIR):
+        self.words = []        # top-level labels, in config order
+        self.categories = {}   # category -> [words]
+        for entry in vocab:
+            if isinstance(entry, str):
+                self.words.append(entry)
+            else:
+                name, items = entry
+                self.words.append(name)
+                self.categories[name] = list(items)
+
+        self.usage_path = None
+        self.codes_path = None
+        if patient_id is not None:
+            self.usage_path = os.path.join(profile_dir, f"{patient_id}_usage.json")
+            self.codes_path = os.path.join(profile_dir, f"{patient_id}_codes.json")
+        self.usage = self.load_usage()
+
+        self.current_category = None
+        saved = self.load_codes()
+        root = saved["root"] if saved else PATIENT_DEFAULT_CODES
+        categories = saved["categories"] if saved else {}
+        # Labels added to or removed from PATIENT_VOCAB only touch their own codes
+        self.root_codes = extend_codes(root, self.words)
+        self.category_codes = {
+            name: extend_codes(categories.get(name, {}), items)
+            for name, items in self.categories.items()
+        }
+        self._expected_blinks = self._compute_expected_blinks()
+
+    def load_usage(self):
+        if not self.usage_path or not os.path.exists(self.usage_path):
+            return {}
+        try:
+            with open(self.usage_path, "r") as f:
+                data = json.load(f)
+            return {str(k): int(v) for k, v in data.items()}
+        except (OSError, ValueError) as e:
+            print(f"Usage history unreadable, starting fresh: {e}")
+            return {}
+
+    def save_usage(self):
+        if not self.usage_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.usage_path) or ".", exist_ok=True)
+            tmp_path = self.usage_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.usage, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.usage_path)
+        except OSError as e:
+            print(f"Could not save usage history: {e}")
+
+    def load_codes(self):
+        """Returns the saved {"root": codes, "categories": {name: codes}}, or None."""
+        if not self.codes_path or not os.path.exists(self.codes_path):
+            return None
+        try:
+            with open(self.codes_path, "r") as f:
+                data = json.load(f)
+            return {
+                "root": {str(c): str(l) for c, l in data["root"].items()},
+                "categories": {
+                    str(name): {str(c): str(l) for c, l in codes.items()}
+                    for name, codes in data.get("categories", {}).items()
+                },
+            }
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"Saved patient codes unreadable, using defaults: {e}")
+            return None
+
+    def save_codes(self):
+        if not self.codes_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.codes_path) or ".", exist_ok=True)
+            tmp_path = self.codes_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"root": self.root_codes, "categories": self.category_codes}, f, indent=2)
+            os.replace(tmp_path, self.codes_path)
+        except OSError as e:
+            print(f"Could not save patient codes: {e}")
+
+    def weight(self, label):
+        if label in self.categories:
+            return sum(self.usage.get(w, 0) for w in self.categories[label])
+        return self.usage.get(label, 0)
+
+    def rebalance(self):
+        """Re-assigns all codes from the current usage counts and saves the table."""
+        self.root_codes = assign_codes([(w, self.weight(w)) for w in self.words])
+        self.category_codes = {
+            name: assign_codes([(w, self.weight(w)) for w in items])
+            for name, items in self.categories.items()
+        }
+        self.current_category = None
+        self._expected_blinks = self._compute_expected_blinks()
+        self.save_codes()
+
+    def record_usage(self, word):
+        self.usage[word] = self.usage.get(word, 0) + 1
+        self.save_usage()
+        # Codes stay put until rebalance(), but the average reflects new usage
+        self._expected_blinks = self._compute_expected_blinks()
+
+    def select(self, sequence):
+        """
+        Resolves a sequence at the current menu level.
+        Returns the command word, or None if a category was opened or the
+        sequence is unknown (which also drops back to the top level).
+        """
+        codes = self.get_active_codes()
+        label = codes.get(sequence)
+        if label is None:
+            self.current_category = None
+            return None
+        if self.current_category is None and label in self.categories:
+            self.current_category = label
+            return None
+        self.current_category = None
+        return label
+
+    def back_to_root(self):
+        self.current_category = None
+
+    def get_active_codes(self):
+        if self.current_category is not None:
+            return self.category_codes[self.current_category]
+        return self.root_codes
+
+    def blinks_for(self, label):
+        """Total blinks needed to issue a command from the top level."""
+        for code, name in self.root_codes.items():
+            if name == label:
+                return len(code)
+        for category, codes in self.category_codes.items():
+            for code, name in codes.items():
+                if name == label:
+                    return self.blinks_for(category) + len(code)
+        return None
+
+    def get_command_list(self):
+        """Returns [(sequence, label, blinks)] for the current menu level, cheapest first."""
+        codes = self.get_active_codes()
+        prefix = 0
+        if self.current_category is not None:
+            prefix = self.blinks_for(self.current_category)
+        return [(code, codes[code], prefix + len(code)) for code in sorted(codes, key=code_order)]
+
+    def _compute_expected_blinks(self):
+        leaves = [w for w in self.words if w not in self.categories]
+        for items in self.categories.values():
+            leaves.extend(items)
+        total = sum(self.usage.get(w, 0) for w in leaves)
+        if total == 0:
+            # No history yet: every command equally likely
+            return sum(self.blinks_for(w) for w in leaves) / max(len(leaves), 1)
+        return sum(self.usage.get(w, 0) * self.blinks_for(w) for w in leaves) / total
+
+    def get_expected_blinks(self):
+        """Usage-weighted average blinks per command under the current codes."""
+        return self._expected_blinks
@@ -1,19 +1,27 @@
 from config import MORSE_CODE_DICT
-from modes import PATIENT_MODE, MORSE_MODE, get_patient_word
+from modes import PATIENT_MODE, MORSE_MODE, PatientVocabulary
+from transcript import Transcript
 
 class MorseDecoder:
-    def __init__(self):
+    def __init__(self, vocabulary=None, transcript=None):
         # Reverse the dictionary for lookup
         self.code_to_char = {v: k for k, v in MORSE_CODE_DICT.items()}
         self.current_sequence = ""
         self.current_word = ""
-        self.decoded_sentence = ""
+        self.transcript = transcript if transcript is not None else Transcript()
         self.mode = MORSE_MODE # Default
+        self.vocabulary = vocabulary if vocabulary is not None else PatientVocabulary()
 
     def set_mode(self, mode):
         self.mode = mode
         self.reset()
 
+    def set_patient(self, vocabulary, transcript):
+        """Switches to another patient's command codes and transcript history."""
+        self.reset()
+        self.vocabulary = vocabulary
+        self.transcript = transcript
+
     def add_signal(self, signal):
         """Adds a dot (.) or dash (-) to the current sequence."""
         self.current_sequence += signal
@@ -27,8 +35,10 @@ class MorseDecoder:
         
         if self.mode == PATIENT_MODE:
             # In Patient Mode, a sequence directly maps to a whole word
-            word = get_patient_word(self.current_sequence)
+            # (or opens a category sub-menu, which returns None)
+            word = self.vocabulary.select(self.current_sequence)
             if word:
+                self.vocabulary.record_usage(word)
                 self.current_word = word
                 result = word
         else:
@@ -49,24 +59,33 @@ class MorseDecoder:
             return None
             
         word = self.current_word
-        self.decoded_sentence += " " + word
+        self.transcript.append(word)
         self.current_word = ""
         return word
 
     def get_display_text(self):
         """Returns the current state for UI display."""
-        # Clean up double spaces if any
-        full_text = self.decoded_sentence.strip()
+        # The transcript is passed as-is, the renderer only reads its tail
         current_building_word = self.current_word
         current_signals = self.current_sequence
         
-        return {
-            "sentence": full_text,
+        data = {
+            "transcript": self.transcript,
             "current_word": current_building_word,
             "current_signals": current_signals
         }
+        if self.mode == PATIENT_MODE:
+            data["commands"] = self.vocabulary.get_command_list()
+            data["category"] = self.vocabulary.current_category
+            data["expected_blinks"] = self.vocabulary.get_expected_blinks()
+        return data
     
     def reset(self):
         self.current_sequence = ""
         self.current_word = ""
-        self.decoded_sentence = ""
+        self.transcript.clear()
+        self.vocabulary.back_to_root()
+
+    @property
+    def decoded_sentence(self):
+        return self.transcript.text
@@ -0,0 +1,109 @@
+import time
+from config import IDLE_TIMEOUT, IDLE_SCAN_INTERVAL
+
+# Package energy counter on Intel/AMD Linux boxes (microjoules)
+RAPL_ENERGY_PATH = "/sys/class/powercap/intel-rapl:0/energy_uj"
+
+
+def read_energy_uj():
+    """Returns the RAPL package energy counter, or None if unavailable."""
+    try:
+        with open(RAPL_ENERGY_PATH, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class IdleController:
+    """
+    Tracks face presence and switches to an idle state after `timeout`
+    seconds without a face. While idle only a presence scan is run every
+    `scan_interval` seconds, which bounds the wake-up latency.
+    CPU time (and energy, where RAPL is readable) is accounted per state
+    so the savings can be reported.
+    """
+    def __init__(self, timeout=IDLE_TIMEOUT, scan_interval=IDLE_SCAN_INTERVAL):
+        self.timeout = timeout
+        self.scan_interval = scan_interval
+        self.is_idle = False
+        self.last_face_time = None
+        self.last_scan_time = 0.0
+
+        # Per-state accounting: wall seconds, CPU seconds, energy microjoules
+        self.totals = {
+            False: {"wall": 0.0, "cpu": 0.0, "energy": 0.0},
+            True: {"wall": 0.0, "cpu": 0.0, "energy": 0.0},
+        }
+        self.energy_available = read_energy_uj() is not None
+        self._mark = None
+
+    def _account(self, now):
+        cpu = time.process_time()
+        energy = read_energy_uj() if self.energy_available else None
+        if self._mark is not None:
+            last_now, last_cpu, last_energy = self._mark
+            bucket = self.totals[self.is_idle]
+            bucket["wall"] += now - last_now
+            bucket["cpu"] += cpu - last_cpu
+            if energy is not None and last_energy is not None and energy >= last_energy:
+                bucket["energy"] += energy - last_energy
+        self._mark = (now, cpu, energy)
+
+    def should_scan(self, now):
+        """While idle, True when the next presence scan is due."""
+        return now - self.last_scan_time >= self.scan_interval
+
+    def update(self, now, face_present):
+        """
+        Feeds the latest presence result.
+        Returns "IDLE" or "WAKE" on a state change, otherwise None.
+        """
+        self._account(now)
+        if self.is_idle:
+            self.last_scan_time = now
+
+        if self.last_face_time is None:
+            self.last_face_time = now
+
+        if face_present:
+            self.last_face_time = now
+            if self.is_idle:
+                self.is_idle = False
+                return "WAKE"
+        elif not self.is_idle and now - self.last_face_time >= self.timeout:
+            self.is_idle = True
+            self.last_scan_time = now
+            return "IDLE"
+        return None
+
+    def get_report(self):
+        """Summary of CPU (and energy) use in active vs idle operation."""
+        active = self.totals[False]
+        idle = self.totals[True]
+        active_cpu_pct = 100.0 * active["cpu"] / active["wall"] if active["wall"] > 0 else 0.0
+        idle_cpu_pct = 100.0 * idle["cpu"] / idle["wall"] if idle["wall"] > 0 else 0.0
+        report = {
+            "active_seconds": active["wall"],
+            "idle_seconds": idle["wall"],
+            "active_cpu_pct": active_cpu_pct,
+            "idle_cpu_pct": idle_cpu_pct,
+            # CPU the idle period would have used at the active rate, minus what it used
+            "cpu_seconds_saved": idle["wall"] * (active_cpu_pct - idle_cpu_pct) / 100.0,
+        }
+        if self.energy_available and active["wall"] > 0 and idle["wall"] > 0:
+            active_watts = active["energy"] / 1e6 / active["wall"]
+            idle_watts = idle["energy"] / 1e6 / idle["wall"]
+            report["active_watts"] = active_watts
+            report["idle_watts"] = idle_watts
+            report["joules_saved"] = idle["wall"] * (active_watts - idle_watts)
+        return report
+
+    def format_report(self):
+        r = self.get_report()
+        text = (f"Idle: {r['idle_seconds']:.0f}s idle / {r['active_seconds']:.0f}s active, "
+                f"CPU {r['idle_cpu_pct']:.0f}% vs {r['active_cpu_pct']:.0f}%, "
+                f"saved {r['cpu_seconds_saved']:.1f} CPU-s")
+        if "joules_saved" in r:
+            text += (f", {r['idle_watts']:.1f}W vs {r['active_watts']:.1f}W, "
+                     f"saved {r['joules_saved']:.0f} J")
+        return text
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import statistics
+import time
+from collections import deque
+from config import (
+    PROFILE_DIR, PROFILE_VERIFY_DURATION, PROFILE_EAR_TOLERANCE,
+    PROFILE_MAX_CLOSED_FRACTION, PROFILE_MATCH_DISTANCE,
+    DOT_DURATION_THRESHOLD, LETTER_PAUSE_THRESHOLD, WORD_PAUSE_THRESHOLD
+)
+
+# Landmark pairs for the geometry signature, each divided by the
+# outer-eye-corner distance so the signature does not depend on scale
+SIGNATURE_REFERENCE = (33, 263)
+SIGNATURE_PAIRS = [
+    (133, 362),   # Inner eye corners
+    (33, 133),    # Right eye width
+    (362, 263),   # Left eye width
+    (1, 152),     # Nose tip to chin
+    (10, 152),    # Forehead to chin
+    (61, 291),    # Mouth width
+    (1, 10),      # Nose tip to forehead
+]
+
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def geometry_signature(landmarks):
+    """Scale-free face proportions from pixel landmarks, or None without a usable face."""
+    if len(landmarks) <= max(max(p) for p in SIGNATURE_PAIRS):
+        return None
+    reference = _distance(landmarks[SIGNATURE_REFERENCE[0]], landmarks[SIGNATURE_REFERENCE[1]])
+    if reference == 0:
+        return None
+    return [_distance(landmarks[a], landmarks[b]) / reference for a, b in SIGNATURE_PAIRS]
+
+
+def signature_distance(a, b):
+    return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+
+
+class SignatureCollector:
+    """Median of recent per-frame signatures (robust to head turns and blinks)."""
+    def __init__(self, maxlen=300):
+        self.signatures = deque(maxlen=maxlen)
+
+    def add(self, landmarks):
+        signature = geometry_signature(landmarks)
+        if signature is not None:
+            self.signatures.append(signature)
+
+    def median(self):
+        if not self.signatures:
+            return None
+        return [statistics.median(values) for values in zip(*self.signatures)]
+
+    def clear(self):
+        self.signatures.clear()
+
+
+class CalibrationProfile:
+    def __init__(self, user_id, threshold, eye_thresholds, open_ear, signature=None,
+                 timing=None, input_method="duration", mode=None, last_used=0.0):
+        self.user_id = user_id
+        self.threshold = threshold
+        self.eye_thresholds = tuple(eye_thresholds)
+        self.open_ear = open_ear            # {"median", "p10", "p90"} of open-eye EAR
+        self.signature = signature
+        self.timing = timing or {
+            "dot": DOT_DURATION_THRESHOLD,
+            "letter": LETTER_PAUSE_THRESHOLD,
+            "word": WORD_PAUSE_THRESHOLD,
+        }
+        self.input_method = input_method
+        self.mode = mode                    # Last active mode, resumed on startup
+        self.last_used = last_used
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "threshold": self.threshold,
+            "eye_thresholds": list(self.eye_thresholds),
+            "open_ear": self.open_ear,
+            "signature": self.signature,
+            "timing": self.timing,
+            "input_method": self.input_method,
+            "mode": self.mode,
+            "last_used": self.last_used,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["user_id"], float(data["threshold"]), data["eye_thresholds"], data["open_ear"],
+            data.get("signature"), data.get("timing"), data.get("input_method", "duration"),
+            data.get("mode"), float(data.get("last_used", 0.0))
+        )
+
+    @classmethod
+    def from_calibrator(cls, user_id, calibrator, signature=None):
+        return cls(
+            user_id, float(calibrator.get_threshold()),
+            [float(t) for t in calibrator.get_eye_thresholds()],
+            calibrator.get_open_ear_stats(), signature
+        )
+
+
+class ProfileStore:
+    """One JSON file per user in PROFILE_DIR: <user>_calibration.json."""
+    SUFFIX = "_calibration.json"
+
+    def __init__(self, profile_dir=PROFILE_DIR):
+        self.profile_dir = profile_dir
+
+    def path_for(self, user_id):
+        return os.path.join(self.profile_dir, f"{user_id}{self.SUFFIX}")
+
+    def load(self, user_id):
+        path = self.path_for(user_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return CalibrationProfile.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Calibration profile {path} unreadable: {e}")
+            return None
+
+    def load_all(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.profile_dir)):
+            if name.endswith(self.SUFFIX):
+                profile = self.load(name[:-len(self.SUFFIX)])
+                if profile is not None:
+                    profiles.append(profile)
+        return profiles
+
+    def get_last_used(self):
+        profiles = self.load_all()
+        if not profiles:
+            return None
+        return max(profiles, key=lambda p: p.last_used)
+
+    def save(self, profile):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = self.path_for(profile.user_id)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(profile.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not save calibration profile: {e}")
+
+    def mark_used(self, profile, now=None):
+        profile.last_used = time.time() if now is None else now
+        self.save(profile)
+
+
+class ProfileVerifier:
+    """
+    Checks a loaded profile against the first seconds of live data.
+    update() returns None while collecting, then one of:
+      ("MATCH", profile)     profile fits, keep it
+      ("SWITCH", other)      face does not match the profile but matches another one
+      ("MISMATCH", None)     the EAR no longer fits, recalibrate the same user
+    Identity is only checked when `candidates` are given (auto-match). Face
+    ratios shift with head pose, so geometry only ever switches between
+    stored profiles. Without a close match the EAR check decides.
+    """
+    def __init__(self, profile, candidates=(), duration=PROFILE_VERIFY_DURATION):
+        self.profile = profile
+        self.candidates = [c for c in candidates if c.signature]
+        self.duration = duration
+        self.start_time = None
+        self.ears = []
+        self.signatures = SignatureCollector()
+
+    def update(self, ear, landmarks, now):
+        if not landmarks:
+            return None
+        if self.start_time is None:
+            self.start_time = now
+        self.ears.append(ear)
+        if self.candidates:
+            self.signatures.add(landmarks)
+        if now - self.start_time < self.duration:
+            return None
+        return self.decide()
+
+    def decide(self):
+        live = self.signatures.median() if self.candidates else None
+        if live is not None and self.profile.signature:
+            own_distance = signature_distance(self.profile.signature, live)
+            if own_distance > PROFILE_MATCH_DISTANCE:
+                best = min(self.candidates, key=lambda c: signature_distance(c.signature, live))
+                if signature_distance(best.signature, live) <= PROFILE_MATCH_DISTANCE:
+                    return ("SWITCH", best)
+                print(f"Profile check: no close face match ({own_distance:.3f}), checking EAR only")
+
+        if not self.ears:
+            return ("MISMATCH", None)
+        open_ears = [e for e in self.ears if e >= self.profile.threshold]
+        closed_fraction = 1.0 - len(open_ears) / len(self.ears)
+        if closed_fraction > PROFILE_MAX_CLOSED_FRACTION:
+            print(f"Profile check: eyes read closed {closed_fraction:.0%} of the time")
+            return ("MISMATCH", None)
+
+        live_median = statistics.median(open_ears)
+        expected = self.profile.open_ear["median"]
+        deviation = abs(live_median - expected) / expected if expected else 1.0
+        if deviation > PROFILE_EAR_TOLERANCE:
+            print(f"Profile check: open-eye EAR {live_median:.3f} vs stored {expected:.3f}")
+            return ("MISMATCH", None)
+        return ("MATCH", self.profile)
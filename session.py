@@ -0,0 +1,144 @@
+import time
+from config import (
+    DOT_DURATION_THRESHOLD, LETTER_PAUSE_THRESHOLD, WORD_PAUSE_THRESHOLD,
+    WINK_SYMBOLS, CONTROL_SYMBOL
+)
+from modes import PATIENT_MODE, MORSE_MODE
+
+
+class InputSession:
+    """
+    Gap timing for the active modes. Turns blink events into symbols and
+    pauses into letters, words and commands on the decoder.
+    update() returns the texts that should be spoken.
+    """
+    def __init__(self, decoder, now=None):
+        self.decoder = decoder
+        # Mode-Specific Buffers
+        self.morse_buffer = ""
+        self.last_blink_end_time = time.time() if now is None else now
+        self.set_timing()
+
+    def set_timing(self, dot=DOT_DURATION_THRESHOLD, letter=LETTER_PAUSE_THRESHOLD,
+                   word=WORD_PAUSE_THRESHOLD):
+        """Per-user timing (seconds), e.g. from a calibration profile."""
+        self.dot_threshold = dot
+        self.letter_pause = letter
+        self.word_pause = word
+
+    def reset(self, now=None):
+        """Clears pending symbols and restarts gap timing."""
+        self.morse_buffer = ""
+        self.last_blink_end_time = time.time() if now is None else now
+
+    def symbol_for(self, blink_event):
+        """Wink events map by eye, plain blinks by duration."""
+        kind = getattr(blink_event, "kind", None)
+        if kind is not None:
+            return WINK_SYMBOLS[kind]
+        return "." if blink_event.duration < self.dot_threshold else "-"
+
+    def update(self, mode, blink_event, blinking, now):
+        if mode == PATIENT_MODE:
+            return self._update_patient(blink_event, now)
+        if mode == MORSE_MODE:
+            return self._update_morse(blink_event, blinking, now)
+        return []
+
+    def _update_patient(self, blink_event, now):
+        # ---------------------------
+        # STRICT PATIENT MODE TIMING
+        # ---------------------------
+        # Rule: Accumulate symbols -> Decode ONLY on WORD GAP (2.5s)
+        decoder = self.decoder
+        spoken = []
+        commit_now = False
+
+        if blink_event:
+            symbol = self.symbol_for(blink_event)
+            if symbol == CONTROL_SYMBOL:
+                # Control symbol: commit without waiting for the pause
+                commit_now = True
+            else:
+                decoder.add_signal(symbol)
+            self.last_blink_end_time = blink_event.end_time
+
+        # Gap Analysis
+        time_since_last = now - self.last_blink_end_time
+
+        # Identify Gap State
+        if commit_now or time_since_last >= self.word_pause:
+            # WORD GAP Reached -> Commit Sequence
+            if decoder.current_sequence:
+                # For Patient Mode, sequence IS the word identifier
+                word = decoder.decode_sequence()
+                if word:
+                    print(f"Patient Command: {word}")
+                    spoken.append(word)
+                    decoder.complete_word() # Flush buffer
+                elif decoder.vocabulary.current_category:
+                    # Sequence opened a sub-menu, wait for the next one
+                    spoken.append(decoder.vocabulary.current_category)
+                else:
+                    # Invalid sequence, still flush to reset
+                    decoder.reset()
+        return spoken
+
+    def _update_morse(self, blink_event, blinking, now):
+        # ---------------------------
+        # STRICT MORSE MODE TIMING
+        # ---------------------------
+        # Rules:
+        # 1. Accumulate symbols in local buffer
+        # 2. Local Buffer -> Decoder on LETTER GAP (1.0s)
+        # 3. Decoder -> Speak on WORD GAP (2.5s)
+        decoder = self.decoder
+        spoken = []
+
+        if blink_event:
+            symbol = self.symbol_for(blink_event)
+            self.last_blink_end_time = blink_event.end_time
+            if symbol == CONTROL_SYMBOL:
+                # Control symbol: end the letter now, or the word if no letter is pending
+                if self.morse_buffer:
+                    self._commit_letter()
+                elif decoder.current_word:
+                    word = decoder.complete_word()
+                    print(f"Speaking Morse: {word}")
+                    spoken.append(word)
+                return spoken
+            self.morse_buffer += symbol
+
+        # Gap Analysis
+        gap_duration = now - self.last_blink_end_time
+
+        # 1. WORD GAP CHECK (Highest Priority)
+        if not blinking and gap_duration >= self.word_pause:
+            # "Decode any pending symbol buffer"
+            if self.morse_buffer:
+                self._commit_letter()
+
+            # Finalize Word
+            if decoder.current_word:
+                word = decoder.complete_word()
+                if word:
+                    print(f"Speaking Morse: {word}")
+                    spoken.append(word)
+
+        # 2. LETTER GAP CHECK
+        elif not blinking and self.morse_buffer and gap_duration >= self.letter_pause:
+            # Commit local buffer to decoder
+            self._commit_letter()
+        return spoken
+
+    def _commit_letter(self):
+        for s in self.morse_buffer:
+            self.decoder.add_signal(s)
+        self.decoder.decode_sequence() # E.g. ".." -> "I"
+        self.morse_buffer = "" # Clear local
+
+    def get_display_text(self):
+        ui_data = self.decoder.get_display_text()
+        if self.morse_buffer:
+            ui_data['current_signals'] = self.morse_buffer
+        return ui_data
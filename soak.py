@@ -0,0 +1,483 @@
+"""
+Long-run soak test for the input pipeline. No camera needed.
+
+Drives blink timing, calibration, gap timing, decoding, the transcript and
+(optionally) overlay rendering with scripted synthetic EAR on a simulated
+clock, so days of use run in minutes. Samples tracemalloc, RSS, the
+transcript and the speech queue, plus per-stage latency percentiles, then
+fails if memory keeps growing faster than the configured slopes or
+latency drifts above its post-warm-up level. Runs shorter than
+SOAK_MIN_GATE_HOURS (after warm-up) are reported but not gated.
+
+    python soak.py --hours 72
+    python soak.py --hours 24 --render-interval 0 --summary soak.json
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+from config import (
+    MORSE_CODE_DICT, IDLE_TIMEOUT, SOAK_MIN_GATE_HOURS,
+    SOAK_MAX_HEAP_SLOPE_KB_PER_HOUR, SOAK_MAX_RSS_SLOPE_KB_PER_HOUR,
+    SOAK_MAX_P95_RATIO, SOAK_P95_SLACK_MS, SOAK_MAX_TTS_BACKLOG
+)
+from blink_state import BlinkStateMachine
+from calibration import Calibrator
+from modes import PATIENT_MODE, MORSE_MODE, CALIBRATION, PatientVocabulary
+from morse_logic import MorseDecoder
+from transcript import Transcript
+from session import InputSession
+from power import IdleController
+from metrics import LatencyStats, RenderScheduler, read_rss_bytes, theil_sen_slope, percentile
+
+# Fewer samples than this after warm-up cannot support a slope fit
+MIN_SAMPLES = 4
+# Latency windows with fewer timings than this have no meaningful p95
+MIN_LATENCY_COUNT = 30
+
+# Stage timings use this thread's CPU time, so preemption on a busy CI box
+# does not read as a latency regression
+stage_clock = time.thread_time
+
+# Synthetic eye behaviour (seconds / EAR)
+OPEN_EAR = 0.30
+CLOSED_EAR = 0.12
+EAR_NOISE = 0.01
+DOT_CLOSE = 0.2
+DASH_CLOSE = 0.8
+SYMBOL_GAP = 0.4
+LETTER_GAP = 1.5
+WORD_GAP = 3.5
+WARMUP_DELAY = 0.5
+
+# Session mix: most sessions continue in the current mode (no reset, so the
+# transcript keeps growing), some are long dictations
+MODE_SWITCH_CHANCE = 0.25
+DICTATION_CHANCE = 0.3
+DICTATION_WORDS = (100, 300)
+
+MORSE_WORDS = ["HELP", "WATER", "YES", "NO", "SOS", "HELLO", "THANKS", "COLD", "PAIN", "LOVE"]
+
+
+class NullSpeaker:
+    """Stands in for TTSEngine so playback speed does not throttle the simulation."""
+    def __init__(self):
+        self.count = 0
+
+    def speak(self, text):
+        if text:
+            self.count += 1
+
+    def stop(self):
+        pass
+
+
+class SilentVoice:
+    """
+    pyttsx3 stand-in for TTSEngine: the real queue and worker thread run,
+    nothing is played, so no audio device is needed.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self.count += 1
+
+    def runAndWait(self):
+        pass
+
+
+class SyntheticEyes:
+    """
+    Scripted EAR source. Each session blinks out Morse words or patient
+    commands, then the patient rests or leaves the frame.
+    get_ear() returns None while no face is visible.
+    """
+    def __init__(self, rng, vocabulary):
+        self.rng = rng
+        self.vocabulary = vocabulary
+        self.segments = deque()    # (duration, closed, present)
+        self.segment_end = 0.0
+        self.current = (0.0, False, True)
+        self.current_mode = MORSE_MODE
+
+    def _blink(self, code):
+        for i, symbol in enumerate(code):
+            close = DOT_CLOSE if symbol == "." else DASH_CLOSE
+            self.segments.append((close * self.rng.uniform(0.8, 1.2), True, True))
+            if i < len(code) - 1:
+                self.segments.append((SYMBOL_GAP * self.rng.uniform(0.8, 1.2), False, True))
+
+    def _script_session(self):
+        mode = self.current_mode
+        if self.rng.random() < MODE_SWITCH_CHANCE:
+            mode = PATIENT_MODE if mode == MORSE_MODE else MORSE_MODE
+            # Mode switch marker: zero-length segment the runner turns into a key press
+            self.segments.append((0.0, mode, True))
+            self.segments.append((1.0, False, True))
+
+        if mode == MORSE_MODE:
+            words = self.rng.randint(1, 4)
+            if self.rng.random() < DICTATION_CHANCE:
+                words = self.rng.randint(*DICTATION_WORDS)
+            for _ in range(words):
+                word = self.rng.choice(MORSE_WORDS)
+                for j, letter in enumerate(word):
+                    self._blink(MORSE_CODE_DICT[letter])
+                    gap = LETTER_GAP if j < len(word) - 1 else WORD_GAP
+                    self.segments.append((gap * self.rng.uniform(0.9, 1.1), False, True))
+        else:
+            for _ in range(self.rng.randint(1, 5)):
+                # Skewed choice so usage counts (and rebalancing) actually move
+                commands = list(self.vocabulary.root_codes.items())
+                index = min(int(self.rng.expovariate(0.5)), len(commands) - 1)
+                code, label = commands[index]
+                self._blink(code)
+                self.segments.append((WORD_GAP * self.rng.uniform(1.0, 1.2), False, True))
+                if label in self.vocabulary.categories:
+                    # Opened a sub-menu, pick its first entry next
+                    self._blink(".")
+                    self.segments.append((WORD_GAP * self.rng.uniform(1.0, 1.2), False, True))
+
+        # Rest with eyes open, sometimes leave the frame long enough to go idle
+        self.segments.append((self.rng.uniform(5.0, 60.0), False, True))
+        if self.rng.random() < 0.3:
+            self.segments.append((self.rng.uniform(IDLE_TIMEOUT, 20 * 60.0), False, False))
+
+    def advance(self, now):
+        """Moves to the segment covering `now`. Returns a mode switch request or None."""
+        switch = None
+        while now >= self.segment_end:
+            if not self.segments:
+                self._script_session()
+            duration, closed, present = self.segments.popleft()
+            if closed in (PATIENT_MODE, MORSE_MODE):
+                switch = closed
+                self.current_mode = closed
+                continue
+            self.current = (duration, closed, present)
+            self.segment_end += duration
+        return switch
+
+    def get_ear(self):
+        _, closed, present = self.current
+        if not present:
+            return None
+        base = CLOSED_EAR if closed else OPEN_EAR
+        return max(0.0, self.rng.gauss(base, EAR_NOISE))
+
+
+class SoakRunner:
+    def __init__(self, args, work_dir):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+        self.vocabulary = PatientVocabulary(patient_id="soak", profile_dir=work_dir)
+        self.transcript = Transcript(max_lines=args.transcript_lines,
+                                     history_path=os.path.join(work_dir, "soak_transcript.txt"))
+        self.decoder = MorseDecoder(self.vocabulary, self.transcript)
+        self.session = InputSession(self.decoder, now=0.0)
+        self.calibrator = Calibrator()
+        self.blink_state = BlinkStateMachine()
+        self.idle = IdleController()
+        self.eyes = SyntheticEyes(self.rng, self.vocabulary)
+        self.latency = LatencyStats()
+
+        self.voice = None
+        if args.tts == "null":
+            self.tts = NullSpeaker()
+        else:
+            from tts_engine import TTSEngine
+            if args.tts == "queue":
+                self.voice = SilentVoice()
+                self.tts = TTSEngine(lambda: self.voice)
+            else:
+                self.tts = TTSEngine()
+
+        self.render = None
+        if args.render_interval > 0:
+            self.render = self._make_renderer()
+
+        self.state = CALIBRATION
+        self.threshold = self.calibrator.get_threshold()
+        self.last_mode_switch_time = -WARMUP_DELAY
+        self.frames = 0
+        # Samples are streamed to disk so the harness's own bookkeeping
+        # never shows up in the heap it measures
+        self.samples_path = os.path.join(work_dir, "soak_samples.jsonl")
+
+    def _make_renderer(self):
+        # Optional: needs OpenCV/NumPy, but no display
+        import numpy as np
+        from ui_overlay import draw_active_ui
+        from frame_buffers import FrameBuffers
+        frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+        buffers = FrameBuffers(1920, 1080)
+        scheduler = RenderScheduler(1.0 / self.args.render_interval, 1.0 / self.args.render_interval)
+
+        def render(now):
+            if not scheduler.is_due(now):
+                return
+            start = stage_clock()
+            canvas = buffers.compose(frame)
+            debug_data = {'ear': OPEN_EAR, 'threshold': self.threshold, 'blinking': self.blink_state.is_closed}
+            draw_active_ui(canvas, self.state, debug_data, self.session.get_display_text())
+            self.latency.record("render", stage_clock() - start)
+            scheduler.mark_rendered(now)
+        return render
+
+    def _switch_mode(self, mode, now):
+        self.state = mode
+        self.decoder.set_mode(mode)
+        self.session.reset(now)
+        self.last_mode_switch_time = now
+
+    def step(self, now):
+        switch = self.eyes.advance(now)
+        if switch and self.state != CALIBRATION:
+            self._switch_mode(switch, now)
+        ear = self.eyes.get_ear()
+        face_present = ear is not None
+
+        if self.idle.is_idle and not self.idle.should_scan(now):
+            return
+        self.frames += 1
+
+        # Detection stage (blink timing on the EAR a landmark backend would produce)
+        start = stage_clock()
+        blink_event = None
+        if self.idle.is_idle:
+            if self.idle.update(now, face_present) == "WAKE":
+                self.blink_state.reset()
+                self.session.reset(now)
+                self.last_mode_switch_time = now
+            self.latency.record("presence", stage_clock() - start)
+            return
+        if face_present:
+            blink_event = self.blink_state.update(ear, self.threshold, now)
+        self.idle.update(now, face_present or self.state == CALIBRATION)
+        self.latency.record("detect", stage_clock() - start)
+
+        if now - self.last_mode_switch_time < WARMUP_DELAY:
+            blink_event = None
+
+        # Decode stage
+        start = stage_clock()
+        if self.state == CALIBRATION:
+            self.calibrator.update(ear if face_present else 0.0, now)
+            if not self.calibrator.is_calibrating:
+                self.threshold = self.calibrator.get_threshold()
+                self._switch_mode(self.eyes.current_mode, now)
+            self.latency.record("calibration", stage_clock() - start)
+        else:
+            for text in self.session.update(self.state, blink_event, self.blink_state.is_closed, now):
+                self.tts.speak(text)
+            self.latency.record("decode", stage_clock() - start)
+
+        if self.render and self.state != CALIBRATION:
+            self.render(now)
+
+    def sample(self, now, wall_start):
+        # Latency windows are released first and garbage collected, so the
+        # heap reading does not swing with how many frames the window held
+        latency_ms = self.latency.summarize()
+        gc.collect()
+        heap, heap_peak = tracemalloc.get_traced_memory()
+        history_path = self.transcript.history_path
+        entry = {
+            "sim_hours": now / 3600.0,
+            "wall_seconds": time.time() - wall_start,
+            "heap_bytes": heap,
+            "heap_peak_bytes": heap_peak,
+            "rss_bytes": read_rss_bytes(),
+            "transcript_lines": len(self.transcript.lines),
+            "transcript_history_bytes": os.path.getsize(history_path) if os.path.exists(history_path) else 0,
+            "calibration_ears": len(self.calibrator.ears),
+            "latency_ms": latency_ms,
+        }
+        queue = getattr(self.tts, "queue", None)
+        if queue is not None:
+            entry["tts_queue"] = queue.qsize()
+        with open(self.samples_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def load_samples(self):
+        with open(self.samples_path, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def run(self):
+        args = self.args
+        dt = 1.0 / args.fps
+        total = args.hours * 3600.0
+        next_sample = args.sample_interval
+        next_recalibration = args.recalibrate_hours * 3600.0 if args.recalibrate_hours > 0 else None
+        wall_start = time.time()
+
+        self.calibrator.start(0.0)
+        self.sample(0.0, wall_start)
+        now = 0.0
+        while now < total:
+            now += dt
+            self.step(now)
+
+            if next_recalibration is not None and now >= next_recalibration:
+                # Caregiver check-in: recalibrate and re-assign patient codes
+                self.vocabulary.rebalance()
+                self.state = CALIBRATION
+                self.calibrator.start(now)
+                self.decoder.reset()
+                self.session.reset(now)
+                next_recalibration += args.recalibrate_hours * 3600.0
+
+            if now >= next_sample:
+                entry = self.sample(now, wall_start)
+                next_sample += args.sample_interval
+                print(f"[soak] {entry['sim_hours']:.1f}h heap={entry['heap_bytes'] / 1024:.0f}KB "
+                      f"rss={(entry['rss_bytes'] or 0) / 1048576:.1f}MB", file=sys.stderr)
+        self.tts.stop()
+        return now, time.time() - wall_start
+
+
+def _median(values):
+    return percentile(sorted(values), 50)
+
+
+def evaluate(samples, warmup_fraction, min_hours=SOAK_MIN_GATE_HOURS):
+    """
+    Checks the samples after the warm-up portion against the gates.
+    Returns (metrics, failures, gated). Memory is gated on a Theil-Sen
+    slope, latency on the median p95 of the last quarter of the window
+    against the first quarter. Windows shorter than `min_hours` (or with
+    too few samples) are measured but not gated.
+    """
+    # The t=0 sample is taken before anything was allocated, always skip it
+    start = max(1, int(len(samples) * warmup_fraction))
+    window = samples[start:]
+    if len(window) < 2:
+        return {}, [], False
+    hours = [s["sim_hours"] for s in window]
+    span = hours[-1] - hours[0]
+
+    metrics = {"heap_kb_per_hour": theil_sen_slope(hours, [s["heap_bytes"] / 1024.0 for s in window])}
+    if all(s["rss_bytes"] is not None for s in window):
+        metrics["rss_kb_per_hour"] = theil_sen_slope(hours, [s["rss_bytes"] / 1024.0 for s in window])
+    if all("tts_queue" in s for s in window):
+        metrics["tts_queue_max"] = max(s["tts_queue"] for s in window)
+
+    quarter = max(1, len(window) // 4)
+    stages = set()
+    for s in window:
+        stages.update(s["latency_ms"].keys())
+    for stage in sorted(stages):
+        p95s = [s["latency_ms"][stage]["p95"] for s in window
+                if s["latency_ms"].get(stage, {}).get("count", 0) >= MIN_LATENCY_COUNT]
+        if not p95s:
+            continue
+        metrics[f"{stage}_p95_ms_start"] = _median(p95s[:quarter])
+        metrics[f"{stage}_p95_ms_end"] = _median(p95s[-quarter:])
+
+    if len(window) < MIN_SAMPLES or span < min_hours:
+        return metrics, [], False
+
+    failures = []
+    if metrics["heap_kb_per_hour"] > SOAK_MAX_HEAP_SLOPE_KB_PER_HOUR:
+        failures.append(f"heap grows {metrics['heap_kb_per_hour']:.1f} KB/h (max {SOAK_MAX_HEAP_SLOPE_KB_PER_HOUR})")
+    if metrics.get("rss_kb_per_hour", 0.0) > SOAK_MAX_RSS_SLOPE_KB_PER_HOUR:
+        failures.append(f"RSS grows {metrics['rss_kb_per_hour']:.1f} KB/h (max {SOAK_MAX_RSS_SLOPE_KB_PER_HOUR})")
+    if metrics.get("tts_queue_max", 0) > SOAK_MAX_TTS_BACKLOG:
+        failures.append(f"speech queue reached {metrics['tts_queue_max']} (max {SOAK_MAX_TTS_BACKLOG})")
+    for stage in sorted(stages):
+        if f"{stage}_p95_ms_start" not in metrics:
+            continue
+        begin = metrics[f"{stage}_p95_ms_start"]
+        end = metrics[f"{stage}_p95_ms_end"]
+        limit = begin * SOAK_MAX_P95_RATIO + SOAK_P95_SLACK_MS
+        if end > limit:
+            failures.append(f"{stage} p95 rose from {begin:.3f} to {end:.3f} ms (max {limit:.3f})")
+    return metrics, failures, True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Accelerated long-run soak test (no camera).")
+    parser.add_argument("--hours", type=float, default=72.0, help="Simulated hours to run")
+    parser.add_argument("--fps", type=float, default=30.0, help="Simulated camera rate")
+    parser.add_argument("--sample-interval", type=float, default=600.0, help="Simulated seconds between samples")
+    parser.add_argument("--render-interval", type=float, default=10.0,
+                        help="Simulated seconds between overlay renders (0 disables, needs OpenCV)")
+    parser.add_argument("--recalibrate-hours", type=float, default=8.0, help="Re-run calibration this often (0 disables)")
+    parser.add_argument("--transcript-lines", type=int, default=30,
+                        help="In-memory transcript cap, below the app's so rolling to disk is reached between recalibrations")
+    parser.add_argument("--tts", choices=["queue", "null", "real"], default="queue",
+                        help="Speech sink: TTSEngine queue with a silent voice, no queue at all, or real audio")
+    parser.add_argument("--warmup-fraction", type=float, default=0.1, help="Share of samples ignored for slope fits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--summary", default="soak_summary.json", help="Where to write the JSON summary")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline prints on stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        runner = SoakRunner(args, work_dir)
+        with open(os.devnull, "w") as devnull:
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+            with quiet:
+                sim_seconds, wall_seconds = runner.run()
+        tracemalloc.stop()
+        samples = runner.load_samples()
+
+    metrics, failures, gated = evaluate(samples, args.warmup_fraction)
+    summary = {
+        "passed": not failures,
+        "gated": gated,
+        "failures": failures,
+        "simulated_hours": sim_seconds / 3600.0,
+        "wall_seconds": wall_seconds,
+        "speedup": sim_seconds / wall_seconds if wall_seconds > 0 else 0.0,
+        "frames_processed": runner.frames,
+        "utterances": getattr(runner.voice or runner.tts, "count", None),
+        "transcript_lines_max": max(s["transcript_lines"] for s in samples),
+        "metrics": metrics,
+        "gates": {
+            "min_hours": SOAK_MIN_GATE_HOURS,
+            "heap_kb_per_hour": SOAK_MAX_HEAP_SLOPE_KB_PER_HOUR,
+            "rss_kb_per_hour": SOAK_MAX_RSS_SLOPE_KB_PER_HOUR,
+            "p95_ratio": SOAK_MAX_P95_RATIO,
+            "p95_slack_ms": SOAK_P95_SLACK_MS,
+            "tts_backlog": SOAK_MAX_TTS_BACKLOG,
+        },
+        "args": vars(args),
+        "samples": samples,
+    }
+    with open(args.summary, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Soak {'PASSED' if not failures else 'FAILED'}: {summary['simulated_hours']:.1f}h simulated "
+          f"in {wall_seconds:.0f}s ({summary['speedup']:.0f}x), {runner.frames} frames")
+    for name, value in metrics.items():
+        print(f"  {name}: {value:.4f}")
+    if not gated:
+        print(f"  Gates not applied: needs {SOAK_MIN_GATE_HOURS:.0f}h after warm-up and {MIN_SAMPLES} samples")
+    for failure in failures:
+        print(f"  FAIL: {failure}")
+    print(f"Summary written to {args.summary}")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
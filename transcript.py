@@ -0,0 +1,91 @@
+import os
+from collections import deque
+from config import TRANSCRIPT_MAX_LINES
+
+
+class _Line:
+    __slots__ = ("words", "width", "text")
+
+    def __init__(self, word, width):
+        self.words = [word]
+        self.width = width
+        self.text = word
+
+
+class Transcript:
+    """
+    Append-only store of completed words with an incrementally maintained
+    line-wrap layout. Each word is measured once when appended, so the cost
+    per frame does not grow with session length. Lines beyond
+    `max_lines` are appended to `history_path` and dropped from memory.
+    """
+    def __init__(self, measure=len, max_width=80, max_lines=TRANSCRIPT_MAX_LINES, history_path=None):
+        self.measure = measure
+        self.max_width = max_width
+        self.space_width = measure(" ")
+        self.max_lines = max_lines
+        self.history_path = history_path
+        self.lines = deque()
+        self.archived_lines = 0
+        self.revision = 0  # Bumped on every visible change
+
+    def set_layout(self, measure, max_width):
+        """Changes the wrap metrics. Only re-measures when they actually change."""
+        if measure is self.measure and max_width == self.max_width:
+            return
+        words = [word for line in self.lines for word in line.words]
+        self.measure = measure
+        self.max_width = max_width
+        self.space_width = measure(" ")
+        self.lines = deque()
+        for word in words:
+            self._place(word)
+
+    def append(self, word):
+        """Adds a completed word at the end of the transcript."""
+        if not word:
+            return
+        self._place(word)
+        self.revision += 1
+        while len(self.lines) > self.max_lines:
+            self._archive(self.lines.popleft())
+
+    def _place(self, word):
+        width = self.measure(word)
+        if self.lines:
+            line = self.lines[-1]
+            new_width = line.width + self.space_width + width
+            if new_width <= self.max_width:
+                line.words.append(word)
+                line.width = new_width
+                line.text += " " + word
+                return
+        self.lines.append(_Line(word, width))
+
+    def _archive(self, line):
+        self.archived_lines += 1
+        if not self.history_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+            with open(self.history_path, "a") as f:
+                f.write(line.text + "\n")
+        except OSError as e:
+            print(f"Could not write transcript history: {e}")
+
+    def get_visible_lines(self, count):
+        """Returns the text of the last `count` wrapped lines."""
+        start = max(0, len(self.lines) - count)
+        return [self.lines[i].text for i in range(start, len(self.lines))]
+
+    @property
+    def text(self):
+        """Full in-memory text. O(n), not meant for the render loop."""
+        return " ".join(line.text for line in self.lines)
+
+    def clear(self):
+        """Archives everything still in memory and starts empty."""
+        if self.lines:
+            self.revision += 1
+        while self.lines:
+            self._archive(self.lines.popleft())
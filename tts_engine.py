@@ -3,7 +3,9 @@ import threading
 import queue
 
 class TTSEngine:
-    def __init__(self):
+    def __init__(self, engine_factory=None):
+        # Anything with setProperty/say/runAndWait works, pyttsx3 by default
+        self.engine_factory = engine_factory or pyttsx3.init
         self.queue = queue.Queue()
         self.running = True
         self.thread = threading.Thread(target=self._loop, daemon=True)
@@ -15,7 +17,7 @@ class TTSEngine:
         """
         try:
             # Initialize engine inside the thread
-            engine = pyttsx3.init()
+            engine = self.engine_factory()
             engine.setProperty('rate', 150)
             engine.setProperty('volume', 1.0)
             
@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
+from functools import lru_cache
 from config import EAR_THRESHOLD_DEFAULT
-from modes import PATIENT_VOCAB
 
 # Fonts
 FONT = cv2.FONT_HERSHEY_SIMPLEX
@@ -12,30 +12,13 @@ COLOR_YELLOW = (0, 255, 255)
 COLOR_GRAY = (200, 200, 200)
 COLOR_BG_DARK = (30, 30, 30)
 
-def wrap_text(text, font, font_scale, max_width):
-    """Splits text into lines that fit within max_width."""
-    if not text:
-        return []
-    
-    words = text.split(' ')
-    lines = []
-    current_line = []
-    
-    for word in words:
-        # Test width with new word
-        test_line = " ".join(current_line + [word])
-        (w, _), _ = cv2.getTextSize(test_line, font, font_scale, 1)
-        
-        if w > max_width and current_line:
-            # Current line is full, push it
-            lines.append(" ".join(current_line))
-            current_line = [word]
-        else:
-             current_line.append(word)
-             
-    if current_line:
-        lines.append(" ".join(current_line))
-    return lines
+SENTENCE_SCALE = 1.0
+
+@lru_cache(maxsize=4096)
+def sentence_text_width(text):
+    """Pixel width of transcript text. Cached, words repeat a lot."""
+    (w, _), _ = cv2.getTextSize(text, FONT, SENTENCE_SCALE, 1)
+    return w
 
 def draw_calibration_ui(frame, calibrator):
     h, w, _ = frame.shape
@@ -69,9 +52,8 @@ def draw_calibration_ui(frame, calibrator):
 
 def draw_mode_selection_ui(frame):
     h, w, _ = frame.shape
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (w, h), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
+    # Darken in place (same as blending 80% black over it, without a full copy)
+    cv2.convertScaleAbs(frame, dst=frame, alpha=0.2)
     
     center_x = w // 2 - 100
     
@@ -92,11 +74,19 @@ def draw_active_ui(frame, mode, detector_data, decoder_data):
     cv2.rectangle(frame, (0, 0), (w, 50), COLOR_BG_DARK, -1)
     
     mode_str = "PATIENT MODE" if mode == "PATIENT_MODE" else "MORSE MODE"
+    if detector_data.get('input_method') == "wink":
+        mode_str += " [WINK]"
     cv2.putText(frame, mode_str, (20, 35), FONT, 1.0, COLOR_GREEN, 2)
     
     ear = detector_data.get('ear', 0.0)
     thresh = detector_data.get('threshold', 0.0)
     cv2.putText(frame, f"EAR: {ear:.2f} | TH: {thresh:.2f}", (400, 35), FONT, 0.7, COLOR_GRAY, 1)
+    detect_fps = detector_data.get('detect_fps', 0.0)
+    display_fps = detector_data.get('display_fps', 0.0)
+    cv2.putText(frame, f"DET: {detect_fps:.0f} FPS | UI: {display_fps:.0f} FPS", (700, 35), FONT, 0.7, COLOR_GRAY, 1)
+    profile = detector_data.get('profile')
+    if profile:
+        cv2.putText(frame, f"USER: {profile}", (video_w + 20, 35), FONT, 0.7, COLOR_GRAY, 1)
     
     # Blink Indicator
     is_blinking = detector_data.get('blinking', False)
@@ -113,15 +103,26 @@ def draw_active_ui(frame, mode, detector_data, decoder_data):
         
         y = 140
         if mode == "PATIENT_MODE":
-            for seq, word in PATIENT_VOCAB.items():
+            category = decoder_data.get('category')
+            expected = decoder_data.get('expected_blinks', 0.0)
+            header = f"> {category}" if category else f"Avg blinks/cmd: {expected:.2f}"
+            cv2.putText(frame, header, (panel_x + 20, y), FONT, 0.7, COLOR_GRAY, 1)
+            y += 40
+            for seq, word, blinks in decoder_data.get('commands', []):
+                if y > h - 60:
+                    break
                 cv2.putText(frame, f"{seq}", (panel_x + 20, y), FONT, 0.8, COLOR_GREEN, 2)
-                cv2.putText(frame, f": {word}", (panel_x + 100, y), FONT, 0.8, COLOR_WHITE, 2)
+                cv2.putText(frame, f": {word}", (panel_x + 140, y), FONT, 0.8, COLOR_WHITE, 2)
+                cv2.putText(frame, f"({blinks})", (w - 70, y), FONT, 0.7, COLOR_GRAY, 1)
                 y += 40
         else:
             common = [('A', '.-'), ('B', '-...'), ('E', '.'), ('T', '-'), ('S', '...'), ('SOS', '...---...')]
             for char, code in common:
                 cv2.putText(frame, f"{char} : {code}", (panel_x + 20, y), FONT, 0.8, COLOR_WHITE, 2)
                 y += 40
+        
+        if detector_data.get('input_method') == "wink":
+            cv2.putText(frame, "WINK: L = .  R = -  BOTH = commit", (panel_x + 20, h - 30), FONT, 0.7, COLOR_YELLOW, 1)
     else:
         # Fallback for small screens (overlay on video right)
         pass 
@@ -140,18 +141,22 @@ def draw_active_ui(frame, mode, detector_data, decoder_data):
     current_word = decoder_data.get('current_word', '')
     cv2.putText(frame, f"Building: {current_word}", (300, start_y + 50), FONT, 1.2, COLOR_GREEN, 2)
     
-    # Final Sentence (Wrapped)
-    sentence = decoder_data.get('sentence', '')
-    
-    text_area_width = video_w - 40
-    wrapped_lines = wrap_text(sentence, FONT, 1.0, text_area_width)
-    
-    # Show last 3 lines
-    max_lines = 3
-    display_lines = wrapped_lines[-max_lines:]
+    # Final Sentence (Wrapped incrementally by the transcript)
+    transcript = decoder_data.get('transcript')
+    display_lines = []
+    if transcript is not None:
+        text_area_width = video_w - 40
+        transcript.set_layout(sentence_text_width, text_area_width)
+        # Show last 3 lines
+        max_lines = 3
+        display_lines = transcript.get_visible_lines(max_lines)
     
     text_y = start_y + 110
     for line in display_lines:
-        cv2.putText(frame, line, (20, text_y), FONT, 1.0, COLOR_WHITE, 2)
+        cv2.putText(frame, line, (20, text_y), FONT, SENTENCE_SCALE, COLOR_WHITE, 2)
         text_y += 40
 
+def draw_idle_ui(frame):
+    h, w, _ = frame.shape
+    cv2.putText(frame, "IDLE - NO FACE DETECTED", (w // 2 - 300, h // 2), FONT, 1.5, COLOR_GRAY, 2)
+    cv2.putText(frame, "Processing resumes when a face is in view", (w // 2 - 330, h // 2 + 60), FONT, 1.0, COLOR_GRAY, 1)